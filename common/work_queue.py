@@ -0,0 +1,229 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+# Общая очередь задач на диске (SQLite) с арендой (lease) задач.
+# Несколько процессов (или машин с общим томом) разбирают одну очередь параллельно:
+# задача выдается одному исполнителю на LEASE_SECONDS, после выполнения отмечается
+# как выполненная, а аренда упавшего исполнителя истекает, и задачу забирает другой.
+# Пока исполнитель жив, аренду взятых им задач продлевает фоновый поток, поэтому
+# долгая задача не выдается второму исполнителю.
+# Модуль общий для rust_mirror и maven_mirror.
+
+# Сколько секунд задача закреплена за исполнителем
+LEASE_SECONDS = 600
+
+# Как часто продлевать аренду взятых задач (в секундах)
+HEARTBEAT_SECONDS = LEASE_SECONDS / 4
+
+# После стольких неудачных попыток задача помечается как failed
+MAX_ATTEMPTS = 5
+
+# Режим журнала SQLite. WAL быстрее, но работает только на локальном диске;
+# для очереди на сетевом томе (несколько машин) используйте "DELETE"
+JOURNAL_MODE = "WAL"
+
+class WorkQueue:
+    """Очередь задач с семантикой claim / complete / release.
+
+    Задача - пара (key, payload), payload - любой JSON-совместимый объект.
+    Все методы безопасны для потоков и процессов: у каждого потока свое
+    соединение, а выдача задач идет в транзакции BEGIN IMMEDIATE.
+    Аренда взятых задач продлевается фоновым потоком до complete/release/abandon.
+    """
+
+    def __init__(self, path, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS, journal_mode=JOURNAL_MODE,
+                 heartbeat_seconds=HEARTBEAT_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_attempts = max_attempts
+        self.journal_mode = journal_mode
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.local = threading.local()
+        # Задачи, взятые этим процессом: их аренду продлевает поток heartbeat
+        self.active = set()
+        self.active_lock = threading.Lock()
+        self.heartbeat_thread = None
+        self.stop_heartbeat = threading.Event()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_until)")
+
+    def _conn(self):
+        """Возвращает соединение текущего потока (sqlite3 не разрешает делить его между потоками)."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def add(self, items, batch_size=10000):
+        """Добавляет задачи [(key, payload)]. Уже существующие ключи пропускаются,
+        поэтому заполнять очередь могут сразу несколько исполнителей."""
+        conn = self._conn()
+        batch = []
+        added = 0
+        for key, payload in items:
+            batch.append((key, json.dumps(payload)))
+            if len(batch) >= batch_size:
+                added += self._insert(conn, batch)
+                batch = []
+        if batch:
+            added += self._insert(conn, batch)
+        return added
+
+    @staticmethod
+    def _insert(conn, batch):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO tasks (key, payload) VALUES (?, ?)", batch)
+            conn.execute("COMMIT")
+            return conn.total_changes - before
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self, limit=1):
+        """Берет в аренду до limit задач: сначала новые, затем с истекшей арендой.
+
+        Задача с истекшей арендой, у которой попытки исчерпаны (исполнитель падал
+        на ней каждый раз), помечается failed, а не выдается снова.
+        Возвращает список (key, payload).
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Два запроса по индексу (status, lease_until) вместо одного с OR: у новых задач
+            # lease_until всегда NULL, поэтому они идут по индексу в порядке rowid без сортировки
+            rows = conn.execute(
+                """
+                SELECT key, payload FROM tasks
+                WHERE status = 'pending' AND lease_until IS NULL
+                ORDER BY rowid
+                LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+            if len(rows) < limit:
+                conn.execute(
+                    """
+                    UPDATE tasks SET status = 'failed', owner = NULL, lease_until = NULL, updated_at = ?
+                    WHERE status = 'leased' AND lease_until < ? AND attempts >= ?
+                    """,
+                    (now, now, self.max_attempts),
+                )
+                rows += conn.execute(
+                    """
+                    SELECT key, payload FROM tasks
+                    WHERE status = 'leased' AND lease_until < ?
+                    ORDER BY lease_until
+                    LIMIT ?
+                    """,
+                    (now, limit - len(rows)),
+                ).fetchall()
+            conn.executemany(
+                """
+                UPDATE tasks SET status = 'leased', owner = ?, lease_until = ?,
+                                 attempts = attempts + 1, updated_at = ?
+                WHERE key = ?
+                """,
+                [(self.owner, now + self.lease_seconds, now, key) for key, _ in rows],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if rows:
+            with self.active_lock:
+                self.active.update(key for key, _ in rows)
+            self._start_heartbeat()
+        return [(key, json.loads(payload)) for key, payload in rows]
+
+    def _start_heartbeat(self):
+        with self.active_lock:
+            if self.heartbeat_thread is None:
+                self.heartbeat_thread = threading.Thread(target=self._heartbeat, daemon=True)
+                self.heartbeat_thread.start()
+
+    def _heartbeat(self):
+        """Продлевает аренду всех задач, которые сейчас выполняет процесс."""
+        while not self.stop_heartbeat.wait(self.heartbeat_seconds):
+            with self.active_lock:
+                keys = list(self.active)
+            if keys:
+                self.renew(keys)
+
+    def renew(self, keys):
+        """Продлевает аренду задач (вызывается потоком heartbeat)."""
+        now = time.time()
+        self._conn().executemany(
+            "UPDATE tasks SET lease_until = ?, updated_at = ? WHERE key = ? AND owner = ? AND status = 'leased'",
+            [(now + self.lease_seconds, now, key, self.owner) for key in keys],
+        )
+
+    def _finish(self, key):
+        with self.active_lock:
+            self.active.discard(key)
+
+    def complete(self, key):
+        """Отмечает задачу выполненной.
+
+        Возвращает False, если задача уже не принадлежит этому исполнителю
+        (аренда истекла и задачу забрал другой).
+        """
+        self._finish(key)
+        cursor = self._conn().execute(
+            """
+            UPDATE tasks SET status = 'done', lease_until = NULL, updated_at = ?
+            WHERE key = ? AND owner = ? AND status = 'leased'
+            """,
+            (time.time(), key, self.owner),
+        )
+        return cursor.rowcount > 0
+
+    def release(self, key):
+        """Возвращает невыполненную задачу в очередь (или помечает failed после MAX_ATTEMPTS попыток)."""
+        self._finish(key)
+        self._conn().execute(
+            """
+            UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                             owner = NULL, lease_until = NULL, updated_at = ?
+            WHERE key = ? AND owner = ? AND status = 'leased'
+            """,
+            (self.max_attempts, time.time(), key, self.owner),
+        )
+
+    def abandon(self, key):
+        """Перестает продлевать аренду задачи (при остановке): она истечет, и задачу заберет другой."""
+        self._finish(key)
+
+    def counts(self):
+        """Возвращает количество задач по статусам."""
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        """Останавливает продление аренды и закрывает соединение текущего потока."""
+        self.stop_heartbeat.set()
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import download_links
+
+# Бенчмарк download_links.py на локальном HTTP-сервере с поддержкой Range.
+# Сервер ограничивает скорость каждого соединения (как CDN ограничивает один поток),
+# поэтому видно, как скорость скачивания растет с числом соединений на файл.
+# В конце проверяется продолжение после прерывания по карте сегментов.
+
+# Размер тестового файла (в байтах)
+BENCH_FILE_SIZE = 64 * 1024 * 1024
+
+# Ограничение скорости одного соединения (байт в секунду)
+CONNECTION_RATE = 8 * 1024 * 1024
+
+# Размер сегмента при бенчмарке
+BENCH_SEGMENT_SIZE = 4 * 1024 * 1024
+
+# Варианты количества соединений для сравнения
+CONNECTION_COUNTS = [1, 2, 4, 8, 16]
+
+# Через сколько секунд прервать загрузку в проверке продолжения
+INTERRUPT_AFTER = 1.5
+
+FILE_BODY = os.urandom(BENCH_FILE_SIZE)
+FILE_SHA256 = hashlib.sha256(FILE_BODY).hexdigest()
+FILE_PATH = "/bench-org/bench-model/resolve/main/model.gguf"
+
+RANGE_RE = re.compile(r"^bytes=(\d+)-(\d*)$")
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Отдает один файл с поддержкой HEAD и Range и ограничением скорости соединения."""
+    protocol_version = "HTTP/1.1"
+    served_bytes = 0
+    lock = threading.Lock()
+
+    def do_HEAD(self):
+        self.send_headers(200, len(FILE_BODY))
+
+    def do_GET(self):
+        if not self.path.startswith(FILE_PATH):
+            self.send_headers(404, 0)
+            return
+        start, end = 0, len(FILE_BODY) - 1
+        match = RANGE_RE.match(self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else end, end)
+            self.send_headers(206, end - start + 1, f"bytes {start}-{end}/{len(FILE_BODY)}")
+        else:
+            self.send_headers(200, len(FILE_BODY))
+        # Отдаем данные блоками по 1/16 секундного лимита
+        block = CONNECTION_RATE // 16
+        try:
+            for offset in range(start, end + 1, block):
+                data = FILE_BODY[offset:min(offset + block, end + 1)]
+                self.wfile.write(data)
+                with RangeHandler.lock:
+                    RangeHandler.served_bytes += len(data)
+                time.sleep(len(data) / CONNECTION_RATE)
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+
+    def send_headers(self, status, length, content_range=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{FILE_SHA256[:16]}"')
+        if content_range:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def run_benchmark(url, connections):
+    """Скачивает тестовый файл через указанное число соединений, возвращает секунды."""
+    work_dir = tempfile.mkdtemp(prefix="hf_bench_")
+    try:
+        path = os.path.join(work_dir, "model.gguf")
+        session = download_links.create_session(connections)
+        started = time.perf_counter()
+        download_links.download_file(session, url, path, connections=connections)
+        elapsed = time.perf_counter() - started
+        assert file_sha256(path) == FILE_SHA256, "содержимое файла не совпадает"
+        return elapsed
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def run_resume_check(url, connections):
+    """Прерывает загрузку, продолжает ее и проверяет, что повторно скачано не больше одного сегмента на соединение.
+
+    Второй запуск должен скачать только то, чего нет по карте сегментов после прерывания,
+    плюс не больше одного сегмента на соединение (байты, записанные после сохранения карты).
+    """
+    work_dir = tempfile.mkdtemp(prefix="hf_bench_")
+    try:
+        path = os.path.join(work_dir, "model.gguf")
+        session = download_links.create_session(connections)
+        timer = threading.Timer(INTERRUPT_AFTER, download_links.stop_event.set)
+        timer.start()
+        first_done = download_links.download_file(session, url, path, connections=connections)
+        timer.cancel()
+        download_links.stop_event.clear()
+        assert not first_done, "загрузка завершилась до прерывания, увеличьте BENCH_FILE_SIZE"
+        with open(path + ".part.segments.json", "r", encoding="utf-8") as f:
+            segment_map = json.load(f)
+        missing = BENCH_FILE_SIZE - sum(done for _, _, done in segment_map["segments"])
+        served_before = RangeHandler.served_bytes
+        download_links.download_file(session, url, path, connections=connections)
+        resumed = RangeHandler.served_bytes - served_before
+        assert file_sha256(path) == FILE_SHA256, "содержимое файла не совпадает"
+        allowed = missing + connections * BENCH_SEGMENT_SIZE
+        assert resumed <= allowed, f"повторно скачано {resumed} байт, допустимо не больше {allowed}"
+        print(f"Продолжение: после прерывания не хватало {missing / 1024 ** 2:.1f} MiB, "
+              f"второй запуск скачал {resumed / 1024 ** 2:.1f} MiB из {BENCH_FILE_SIZE / 1024 ** 2:.0f} MiB, sha256 совпадает")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    download_links.SEGMENT_SIZE = BENCH_SEGMENT_SIZE
+    download_links.MIN_SEGMENTED_SIZE = 0
+    download_links.SAVE_INTERVAL = 0.5
+    download_links.RETRY_DELAY = 0.1
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}{FILE_PATH}?download=true"
+
+    print(f"Сервер с Range: {url}, {BENCH_FILE_SIZE // 1024 ** 2} MiB, "
+          f"{CONNECTION_RATE // 1024 ** 2} MiB/s на соединение")
+    try:
+        results = []
+        for connections in CONNECTION_COUNTS:
+            elapsed = run_benchmark(url, connections)
+            results.append((connections, elapsed))
+        for connections, elapsed in results:
+            print(f"соединений {connections:3d}: {elapsed:6.2f} с ({BENCH_FILE_SIZE / elapsed / 1024 ** 2:7.1f} MiB/s)")
+        run_resume_check(url, 4)
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
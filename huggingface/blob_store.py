@@ -0,0 +1,88 @@
+import hashlib
+import os
+import shutil
+import threading
+
+# Общее хранилище файлов моделей по содержимому: LFS-файл с sha256 хранится один раз
+# в BLOB_STORE_DIR/<первые 2 символа>/<sha256>, а в каталог каждой модели попадает
+# жесткая ссылка на него. Одинаковые файлы разных репозиториев (токенизаторы, конфиги,
+# перезалитые модели) не скачиваются и не занимают место повторно.
+# Жесткие ссылки работают только в пределах одного диска, поэтому хранилище должно
+# лежать на том же диске, что и модели; иначе файл копируется.
+# Файлы по ссылкам общие: изменение файла в одной модели меняет его во всех.
+
+# Каталог хранилища (на том же диске, что и модели)
+BLOB_STORE_DIR = "f://models/.blobs"
+
+# Проверять sha256 файла перед добавлением в хранилище
+VERIFY_SHA256 = True
+
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+_lock = threading.Lock()
+
+def blob_path(sha256):
+    return os.path.join(BLOB_STORE_DIR, sha256[:2], sha256)
+
+def has_blob(sha256, size=None):
+    """Проверяет, есть ли файл в хранилище (и совпадает ли размер, если он известен)."""
+    path = blob_path(sha256)
+    return os.path.exists(path) and (size is None or os.path.getsize(path) == size)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_linked(path, sha256):
+    """Проверяет, что path уже является ссылкой на файл хранилища."""
+    try:
+        return os.path.samefile(path, blob_path(sha256))
+    except OSError:
+        return False
+
+def link_into(sha256, target_path):
+    """Создает в target_path жесткую ссылку на файл хранилища (или копию, если ссылка невозможна).
+
+    Существующий target_path заменяется атомарно. Возвращает "link" или "copy".
+    """
+    if is_linked(target_path, sha256):
+        return "link"
+    os.makedirs(os.path.dirname(target_path) or ".", exist_ok=True)
+    tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.link"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)  # Остался после прерванного запуска
+    try:
+        os.link(blob_path(sha256), tmp_path)
+        method = "link"
+    except OSError:
+        # Другой диск или файловая система без жестких ссылок: копия, сделанная
+        # в прошлый раз, не копируется заново
+        if os.path.exists(target_path) and os.path.getsize(target_path) == os.path.getsize(blob_path(sha256)):
+            return "copy"
+        shutil.copyfile(blob_path(sha256), tmp_path)
+        method = "copy"
+    os.replace(tmp_path, target_path)
+    return method
+
+def add_file(path, sha256):
+    """Переносит скачанный файл в хранилище и оставляет на его месте ссылку.
+
+    Возвращает False, если sha256 файла не совпадает с ожидаемым (файл не трогается).
+    """
+    if VERIFY_SHA256 and file_sha256(path) != sha256:
+        return False
+    with _lock:
+        if has_blob(sha256):
+            # Такой же файл уже добавлен (например, другим потоком) - копия не нужна
+            link_into(sha256, path)
+            return True
+        os.makedirs(os.path.dirname(blob_path(sha256)), exist_ok=True)
+        try:
+            os.link(path, blob_path(sha256))
+        except OSError:
+            shutil.copyfile(path, blob_path(sha256) + ".tmp")
+            os.replace(blob_path(sha256) + ".tmp", blob_path(sha256))
+    return True
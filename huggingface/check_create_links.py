@@ -0,0 +1,129 @@
+import importlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Проверка разбора API дерева репозитория в сreate_links.py на сохраненных ответах
+# (каталог fixtures): локальный HTTP-сервер отдает их вместо huggingface.co.
+# Проверяются переход по страницам из заголовка Link, подкаталог, корень без рекурсии,
+# пути, размеры, sha256 из lfs.oid и кодирование путей с пробелами и кириллицей в ссылках.
+
+# Имя файла начинается с кириллической "с"
+create_links = importlib.import_module("сreate_links")
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+MODEL_REPO = "test-org/test-model"
+TREE_PATH = f"/api/models/{MODEL_REPO}/tree/main"
+
+# Ответы сервера: (путь, строка запроса) -> (файл ответа, строка запроса следующей страницы)
+ROUTES = {
+    (TREE_PATH, "recursive=true"): ("tree_recursive_page1.json", "recursive=true&cursor=ZXlKbWFXeGxYMjVoYldVaU9pSlJORjlMWDAwaWZRPT0%3D"),
+    (TREE_PATH, "recursive=true&cursor=ZXlKbWFXeGxYMjVoYldVaU9pSlJORjlMWDAwaWZRPT0%3D"): ("tree_recursive_page2.json", None),
+    (TREE_PATH, ""): ("tree_root.json", None),
+    (TREE_PATH + "/Q4_K_M", "recursive=true"): ("tree_Q4_K_M.json", None),
+}
+
+# Ожидаемые файлы: путь, размер, sha256 (None для файлов не из LFS), путь в ссылке
+EXPECTED_FILES = {
+    ".gitattributes": (1570, None, ".gitattributes"),
+    "Q4_K_M/GLM-5-Q4_K_M-00001-of-00002.gguf": (
+        49956125824, "d0b712122b876d06e95e56ec7d7764e6dba49c693af1e3f95bafda8947568d59",
+        "Q4_K_M/GLM-5-Q4_K_M-00001-of-00002.gguf"),
+    "Q4_K_M/GLM-5-Q4_K_M-00002-of-00002.gguf": (
+        21474836480, "ae0475c31496d63ed1a86acb8a5d27f4bc6cceaceff5c4e2406e4e29a2e00aeb",
+        "Q4_K_M/GLM-5-Q4_K_M-00002-of-00002.gguf"),
+    "Q5_K_M/GLM 5 Q5_K_M #1 (копия).gguf": (
+        60129542144, "ba2fd61c573ae0183245b5e33bb330a2f5f56a2dc0884e20f75cfb8de32e93af",
+        "Q5_K_M/GLM%205%20Q5_K_M%20%231%20%28%D0%BA%D0%BE%D0%BF%D0%B8%D1%8F%29.gguf"),
+    "README.md": (5214, None, "README.md"),
+    "config.json": (1083, None, "config.json"),
+}
+
+class TreeHandler(BaseHTTPRequestHandler):
+    """Отдает сохраненные ответы API дерева, следующая страница - в заголовке Link."""
+    protocol_version = "HTTP/1.1"
+    requests_served = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with TreeHandler.lock:
+            TreeHandler.requests_served += 1
+        parts = urlsplit(self.path)
+        route = ROUTES.get((parts.path, parts.query))
+        if route is None:
+            self.send_body(404, b'{"error": "not found"}')
+            return
+        fixture, next_query = route
+        with open(os.path.join(FIXTURES_DIR, fixture), "rb") as f:
+            body = f.read()
+        link = None
+        if next_query:
+            link = f'<http://{self.headers["Host"]}{parts.path}?{next_query}>; rel="next"'
+        self.send_body(200, body, link)
+
+    def send_body(self, status, body, link=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if link:
+            self.send_header("Link", link)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def check_files(files, expected_paths):
+    """Сравнивает найденные файлы с EXPECTED_FILES (порядок - как в ответах API)."""
+    assert [entry["path"] for entry in files] == expected_paths, [entry["path"] for entry in files]
+    for entry in files:
+        size, sha256, url_path = EXPECTED_FILES[entry["path"]]
+        assert entry["size"] == size, (entry["path"], entry["size"])
+        assert entry["sha256"] == sha256, (entry["path"], entry["sha256"])
+        expected_url = f"{create_links.HUGGINGFACE_BASE_URL}/{MODEL_REPO}/resolve/main/{url_path}?download=true"
+        assert entry["url"] == expected_url, (entry["url"], expected_url)
+
+def check_recursive():
+    """DOWNLOAD_ALL: все файлы репозитория за два запроса (вторая страница - по Link)."""
+    served_before = TreeHandler.requests_served
+    files = create_links.list_repo_tree(MODEL_REPO)
+    check_files(files, list(EXPECTED_FILES))
+    assert TreeHandler.requests_served - served_before == 2, "ожидалось две страницы"
+    print(f"Рекурсивный список: {len(files)} файлов с двух страниц, проверка пройдена")
+
+def check_subfolders():
+    """SUBFOLDERS = ["", "Q4_K_M"]: файлы корня без подкаталогов и файлы подкаталога."""
+    files = create_links.list_files_api(MODEL_REPO, ["", "Q4_K_M"])
+    check_files(files, [
+        ".gitattributes", "README.md", "config.json",
+        "Q4_K_M/GLM-5-Q4_K_M-00001-of-00002.gguf", "Q4_K_M/GLM-5-Q4_K_M-00002-of-00002.gguf",
+    ])
+    print(f"Корень и подкаталог: {len(files)} файлов, проверка пройдена")
+
+def check_fixtures():
+    """Сохраненные ответы - списки записей API в формате JSON."""
+    for fixture, _ in ROUTES.values():
+        with open(os.path.join(FIXTURES_DIR, fixture), "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        assert all(entry["type"] in ("file", "directory") for entry in entries), fixture
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TreeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    create_links.HUGGINGFACE_BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    create_links.REVISION = "main"
+    create_links.HF_TOKEN = None
+    try:
+        check_fixtures()
+        check_recursive()
+        check_subfolders()
+        print("сreate_links.py: все проверки пройдены")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Скачивание файлов по ссылкам из download_links.txt (его создает сreate_links.py).
+# Большой файл делится на сегменты (диапазоны байт), которые качаются параллельно
+# по нескольким соединениям: одно TCP-соединение до CDN не загружает канал полностью.
+# Для каждого файла рядом хранится карта сегментов (<файл>.part.segments.json),
+# поэтому после прерывания каждый сегмент продолжается с того места, где остановился.
+# Если сервер не поддерживает Range, файл качается одним соединением и после обрыва
+# начинается заново.
+
+# --- НАСТРОЙКИ ---
+LINKS_FILE = "download_links.txt"
+
+# Файлы сохраняются в OUTPUT_DIR/<имя репозитория>/<путь в репозитории>
+OUTPUT_DIR = "F://models"
+
+# Токен Hugging Face для закрытых репозиториев (None - без авторизации)
+HF_TOKEN = None
+
+# Количество параллельных соединений на один файл
+CONNECTIONS_PER_FILE = 8
+
+# Размер сегмента (в байтах). Сегментов больше, чем соединений: освободившееся
+# соединение берет следующий сегмент, поэтому медленное соединение не задерживает весь файл
+SEGMENT_SIZE = 256 * 1024 * 1024
+
+# Файлы меньше этого размера качаются одним соединением
+MIN_SEGMENTED_SIZE = 64 * 1024 * 1024
+
+# Как часто сохранять карту сегментов и выводить прогресс (в секундах)
+SAVE_INTERVAL = 5
+
+MAX_RETRIES = 5
+RETRY_DELAY = 5
+REQUEST_TIMEOUT = 60
+CHUNK_SIZE = 1024 * 1024
+
+stop_event = threading.Event()
+
+def create_session(connections=CONNECTIONS_PER_FILE):
+    """Сессия с пулом keep-alive соединений на CONNECTIONS_PER_FILE потоков."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=connections)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if HF_TOKEN:
+        session.headers["Authorization"] = f"Bearer {HF_TOKEN}"
+    return session
+
+def local_path_for(url):
+    """Путь для ссылки вида https://huggingface.co/<org>/<repo>/resolve/main/<путь>?download=true."""
+    parts = unquote(urlsplit(url).path).strip("/").split("/")
+    if len(parts) > 4 and parts[2] == "resolve":
+        return os.path.join(OUTPUT_DIR, parts[1], *parts[4:])
+    return os.path.join(OUTPUT_DIR, *parts[-1:])
+
+def probe(session, url):
+    """Узнает размер файла, его ETag и поддержку Range (HEAD с переходом по редиректу на CDN)."""
+    response = session.head(url, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    size = response.headers.get("Content-Length")
+    size = int(size) if size and size.isdigit() else None
+    etag = response.headers.get("ETag")
+    accepts_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+    return size, etag, accepts_ranges
+
+def plan_segments(size, segmented):
+    """Делит файл на сегменты [начало, конец (включительно), скачано байт]."""
+    if not segmented or size < MIN_SEGMENTED_SIZE:
+        return [[0, size - 1, 0]]
+    return [[start, min(start + SEGMENT_SIZE, size) - 1, 0] for start in range(0, size, SEGMENT_SIZE)]
+
+def load_segment_map(map_path, url, size, etag, accepts_ranges):
+    """Читает карту сегментов, если она относится к тому же файлу на сервере.
+
+    Карта сбрасывается и тогда, когда сервер перестал (или начал) поддерживать Range:
+    сегменты, размеченные при другой поддержке, скачать по ней нельзя.
+    """
+    try:
+        with open(map_path, "r", encoding="utf-8") as f:
+            segment_map = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if segment_map.get("url") != url or segment_map.get("size") != size or segment_map.get("etag") != etag:
+        print("Файл на сервере изменился, скачивание начнется заново")
+        return None
+    if segment_map.get("accepts_ranges", accepts_ranges) != accepts_ranges:
+        print("Поддержка Range на сервере изменилась, скачивание начнется заново")
+        return None
+    return segment_map
+
+def save_segment_map(map_path, segment_map):
+    """Сохраняет карту сегментов через временный файл (карта не бывает недописанной)."""
+    tmp_path = map_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(segment_map, f)
+    os.replace(tmp_path, map_path)
+
+class SegmentedDownload:
+    """Скачивание одного файла сегментами в заранее выделенный файл .part."""
+
+    def __init__(self, session, url, part_path, segment_map):
+        self.session = session
+        self.url = url
+        self.part_path = part_path
+        self.map_path = part_path + ".segments.json"
+        self.segment_map = segment_map
+        self.lock = threading.Lock()
+        self.last_saved = time.monotonic()
+        self.started = time.monotonic()
+        self.started_bytes = self.downloaded_bytes()
+
+    def downloaded_bytes(self):
+        return sum(done for _, _, done in self.segment_map["segments"])
+
+    def report(self, force=False):
+        """Периодически сохраняет карту сегментов и выводит прогресс (вызывается под self.lock)."""
+        now = time.monotonic()
+        if not force and now - self.last_saved < SAVE_INTERVAL:
+            return
+        save_segment_map(self.map_path, self.segment_map)
+        self.last_saved = now
+        downloaded = self.downloaded_bytes()
+        size = self.segment_map["size"]
+        speed = (downloaded - self.started_bytes) / max(now - self.started, 1e-6)
+        print(f"  {downloaded / 1024 ** 3:.2f} / {size / 1024 ** 3:.2f} GiB "
+              f"({downloaded * 100 / max(size, 1):.1f}%), {speed / 1024 ** 2:.1f} MiB/s")
+
+    def download_segment(self, segment):
+        """Качает один сегмент с места остановки. Возвращает True, если сегмент скачан полностью."""
+        start, end, _ = segment
+        for attempt in range(MAX_RETRIES):
+            position = start + segment[2]
+            if position > end or stop_event.is_set():
+                return position > end
+            try:
+                headers = {"Range": f"bytes={position}-{end}"}
+                with self.session.get(self.url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as r:
+                    r.raise_for_status()
+                    if r.status_code != 206 and position != 0:
+                        if start != 0 or end != self.segment_map["size"] - 1:
+                            raise requests.exceptions.HTTPError(f"Сервер не вернул диапазон (HTTP {r.status_code})")
+                        # Сервер отдал файл целиком: единственный сегмент начинается заново
+                        print("  сервер не поддержал докачку, файл скачивается с начала")
+                        position = 0
+                        with self.lock:
+                            segment[2] = 0
+                    # Без буферизации: байты, учтенные в карте сегментов, уже переданы ОС
+                    with open(self.part_path, "r+b", buffering=0) as f:
+                        f.seek(position)
+                        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                            if stop_event.is_set():
+                                return False
+                            chunk = chunk[:end + 1 - position]
+                            f.write(chunk)
+                            position += len(chunk)
+                            with self.lock:
+                                segment[2] = position - start
+                                self.report()
+                            if position > end:
+                                break
+                if position > end:
+                    return True
+                print(f"  соединение закрыто на {position} байт, продолжаем сегмент {start}-{end}")
+            except (requests.exceptions.RequestException, OSError) as e:
+                print(f"  ошибка сегмента {start}-{end} (попытка {attempt + 1} из {MAX_RETRIES}): {e}")
+                time.sleep(RETRY_DELAY)
+        return False
+
+    def run(self, connections):
+        segments = [segment for segment in self.segment_map["segments"] if segment[0] + segment[2] <= segment[1]]
+        try:
+            with ThreadPoolExecutor(max_workers=connections) as executor:
+                try:
+                    results = list(executor.map(self.download_segment, segments))
+                except KeyboardInterrupt:
+                    stop_event.set()  # Потоки дописывают текущий блок и выходят
+                    raise
+        finally:
+            with self.lock:
+                self.report(force=True)
+        return all(results)
+
+def preallocate(part_path, size):
+    """Создает файл .part нужного размера, чтобы сегменты писались по своим смещениям."""
+    os.makedirs(os.path.dirname(part_path) or ".", exist_ok=True)
+    mode = "r+b" if os.path.exists(part_path) else "wb"
+    with open(part_path, mode) as f:
+        f.truncate(size)
+
+def download_file(session, url, path, connections=CONNECTIONS_PER_FILE):
+    """Скачивает файл по ссылке. Возвращает True, если файл скачан (или уже был скачан)."""
+    size, etag, accepts_ranges = probe(session, url)
+    if os.path.exists(path) and (size is None or os.path.getsize(path) == size):
+        print(f"Файл уже скачан: {path}")
+        return True
+
+    part_path = path + ".part"
+    map_path = part_path + ".segments.json"
+    if size is None:
+        # Размер неизвестен - сегментировать нечего, качаем одним потоком целиком
+        print(f"Скачивание {url} (размер неизвестен)")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with session.get(url, stream=True, timeout=REQUEST_TIMEOUT) as r:
+            r.raise_for_status()
+            with open(part_path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+        os.replace(part_path, path)
+        return True
+
+    segment_map = None
+    if os.path.exists(part_path) and accepts_ranges:
+        # Без поддержки Range скачанную часть продолжить нельзя - файл качается с начала
+        segment_map = load_segment_map(map_path, url, size, etag, accepts_ranges)
+    if segment_map is None:
+        segment_map = {"url": url, "size": size, "etag": etag, "accepts_ranges": accepts_ranges,
+                       "segments": plan_segments(size, accepts_ranges)}
+    preallocate(part_path, size)
+    save_segment_map(map_path, segment_map)
+
+    segments = len(segment_map["segments"])
+    print(f"Скачивание {url}: {size / 1024 ** 3:.2f} GiB, сегментов {segments}, "
+          f"соединений {min(connections, segments)}")
+    download = SegmentedDownload(session, url, part_path, segment_map)
+    if not download.run(connections):
+        print(f"Файл скачан не полностью, при следующем запуске загрузка продолжится: {path}")
+        return False
+    os.replace(part_path, path)
+    os.remove(map_path)
+    print(f"Файл скачан: {path}")
+    return True
+
+def read_links(filename):
+    with open(filename, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+def main():
+    links = read_links(LINKS_FILE)
+    print(f"Ссылок в {LINKS_FILE}: {len(links)}")
+    session = create_session()
+    failed = []
+    try:
+        for index, url in enumerate(links, start=1):
+            print(f"[{index}/{len(links)}] {url}")
+            try:
+                if not download_file(session, url, local_path_for(url)):
+                    failed.append(url)
+            except (requests.exceptions.RequestException, OSError) as e:
+                print(f"Не удалось скачать {url}: {e}")
+                failed.append(url)
+    except KeyboardInterrupt:
+        stop_event.set()
+        print("Прерывание: карта сегментов сохранена, загрузка продолжится при следующем запуске")
+        raise
+    if failed:
+        print(f"Не скачано файлов: {len(failed)}")
+    else:
+        print("Все файлы скачаны")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,14 @@
-from huggingface_hub import snapshot_download
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from huggingface_hub import HfApi, hf_hub_url
+from huggingface_hub.hf_api import RepoFile
+from requests.adapters import HTTPAdapter
+
+import blob_store
 
 model_names = [
     "lmstudio-community/Qwen3-32B-GGUF",
@@ -9,19 +19,281 @@ model_names = [
 
 base_output_dir = "f://models"
 
-for model_name in model_names:
-    output_dir = f"{base_output_dir}/{model_name.split('/')[-1]}"
-    
-    print(f"Скачивание модели {model_name} в {output_dir}...")
-    
-    snapshot_download(
-        repo_id=model_name,
-        local_dir=output_dir,
-        local_dir_use_symlinks=False,
-        resume_download=True,          
-        token=None                     
-    )
-    
-    print(f"Модель {model_name} успешно скачана в {output_dir}\n")
-
-print("Все модели успешно скачаны.")
\ No newline at end of file
+# Все модели раскладываются в одну очередь файлов, которую разбирают GLOBAL_WORKERS потоков:
+# маленькие репозитории не ждут окончания большого, а канал загружен до конца списка.
+
+# Количество одновременно скачиваемых файлов (по всем моделям)
+GLOBAL_WORKERS = 8
+
+# Общее ограничение скорости (байт в секунду), None - без ограничения
+MAX_BANDWIDTH = None  # Например, 50 * 1024 * 1024
+
+# Порядок очереди:
+# "largest_first" - сначала большие файлы (меньше общее время: в конце не остается один большой файл)
+# "shortest_first" - сначала маленькие (небольшие модели скачиваются целиком раньше)
+QUEUE_ORDER = "largest_first"
+
+# Токен Hugging Face для закрытых репозиториев (None - без авторизации)
+HF_TOKEN = None
+
+# Хранить LFS-файлы один раз в общем хранилище по sha256 (blob_store.py), а в каталоги
+# моделей ставить жесткие ссылки: уже скачанные в любую модель файлы не скачиваются снова
+USE_BLOB_STORE = True
+
+# Как часто выводить общую скорость и оставшееся время (в секундах)
+REPORT_INTERVAL = 10
+
+MAX_RETRIES = 5
+RETRY_DELAY = 5
+REQUEST_TIMEOUT = 60
+CHUNK_SIZE = 1024 * 1024
+
+stop_event = threading.Event()
+
+class TokenBucket:
+    """Общее ограничение скорости для всех потоков (байт в секунду)."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = rate  # Допускается всплеск не больше секундного объема
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        """Списывает amount байт и ждет, если бюджет исчерпан (долг возвращается ожиданием)."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+class Progress:
+    """Общий прогресс по всем моделям: скорость, оставшееся время, число скачанных файлов."""
+
+    def __init__(self, tasks):
+        self.total_bytes = sum(task["size"] for task in tasks)
+        self.total_files = len(tasks)
+        self.done_bytes = 0
+        self.done_files = 0
+        self.session_bytes = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add_bytes(self, amount, downloaded=True):
+        with self.lock:
+            self.done_bytes += amount
+            if downloaded:
+                self.session_bytes += amount
+
+    def file_done(self):
+        with self.lock:
+            self.done_files += 1
+
+    def report(self):
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started, 1e-6)
+            speed = self.session_bytes / elapsed
+            remaining = self.total_bytes - self.done_bytes
+            eta = time.strftime("%H:%M:%S", time.gmtime(remaining / speed)) if speed else "--:--:--"
+            print(f"Файлов {self.done_files}/{self.total_files}, "
+                  f"{self.done_bytes / 1024 ** 3:.2f}/{self.total_bytes / 1024 ** 3:.2f} GiB, "
+                  f"{speed / 1024 ** 2:.1f} MiB/s, осталось {eta}")
+
+    def report_periodically(self, done):
+        """Выводит прогресс каждые REPORT_INTERVAL секунд, пока не установлено событие done."""
+        while not done.wait(REPORT_INTERVAL):
+            self.report()
+
+def create_session():
+    """Сессия с пулом keep-alive соединений на GLOBAL_WORKERS потоков."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=GLOBAL_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if HF_TOKEN:
+        session.headers["Authorization"] = f"Bearer {HF_TOKEN}"
+    return session
+
+def list_model_files(api, model_name, output_dir, path_in_repo=None):
+    """Раскладывает репозиторий модели (или его подкаталог) в задачи по файлам (путь, размер, sha256 для LFS-файлов)."""
+    tasks = []
+    for entry in api.list_repo_tree(model_name, path_in_repo=path_in_repo, recursive=True, token=HF_TOKEN):
+        if not isinstance(entry, RepoFile):
+            continue  # Каталоги
+        tasks.append({
+            "model_name": model_name,
+            "path": entry.path,
+            "size": entry.size,
+            "sha256": entry.lfs.sha256 if entry.lfs else None,
+            "url": hf_hub_url(model_name, entry.path),
+            "local_path": os.path.join(output_dir, *entry.path.split("/")),
+        })
+    return tasks
+
+def order_tasks(tasks):
+    return sorted(tasks, key=lambda task: task["size"], reverse=QUEUE_ORDER == "largest_first")
+
+def download_task(session, task, bucket, progress):
+    """Скачивает один файл с продолжением с места остановки (файл .part и заголовок Range).
+
+    Ошибки файловой системы (файл открыт другой программой, нет места, нет прав)
+    не прерывают общую очередь: задача возвращает False и попадает в список не скачанных.
+    """
+    path = task["local_path"]
+    sha256 = task["sha256"] if USE_BLOB_STORE else None
+    try:
+        if sha256 and blob_store.has_blob(sha256, task["size"]):
+            # Файл уже есть в хранилище (скачан для этой или другой модели)
+            blob_store.link_into(sha256, path)
+            progress.add_bytes(task["size"], downloaded=False)
+            progress.file_done()
+            return True
+        if os.path.exists(path) and os.path.getsize(path) == task["size"]:
+            # Скачанный раньше файл добавляется в хранилище, чтобы другие модели ссылались на него
+            if sha256 and not blob_store.add_file(path, sha256):
+                print(f"sha256 не совпадает, файл не добавлен в хранилище: {path}")
+            progress.add_bytes(task["size"], downloaded=False)
+            progress.file_done()
+            return True
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    except OSError as e:
+        print(f"Ошибка файловой системы {task['model_name']}/{task['path']}: {e}")
+        return False
+
+    part_path = path + ".part"
+    counted = 0  # Сколько байт этого файла уже учтено в общем прогрессе
+    for attempt in range(MAX_RETRIES):
+        downloaded_size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if downloaded_size > counted:
+            progress.add_bytes(downloaded_size - counted, downloaded=False)
+            counted = downloaded_size
+        headers = {"Range": f"bytes={downloaded_size}-"} if downloaded_size else {}
+        try:
+            with session.get(task["url"], headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as r:
+                if r.status_code == 416:
+                    if downloaded_size == task["size"]:
+                        break  # Файл уже скачан полностью
+                    # Файл .part больше серверного - скачиваем заново
+                    os.remove(part_path)
+                    progress.add_bytes(-counted, downloaded=False)
+                    counted = 0
+                    continue
+                r.raise_for_status()
+                if r.status_code != 206 and downloaded_size:
+                    # Сервер не поддержал докачку - начинаем файл заново
+                    progress.add_bytes(-counted, downloaded=False)
+                    counted = 0
+                mode = "ab" if r.status_code == 206 else "wb"
+                with open(part_path, mode) as f:
+                    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                        if stop_event.is_set():
+                            return False
+                        if bucket:
+                            bucket.consume(len(chunk))
+                        f.write(chunk)
+                        counted += len(chunk)
+                        progress.add_bytes(len(chunk))
+            if os.path.getsize(part_path) == task["size"]:
+                break
+            print(f"Файл получен не полностью, продолжаем: {task['model_name']}/{task['path']}")
+        except (requests.exceptions.RequestException, OSError) as e:
+            print(f"Ошибка при скачивании {task['model_name']}/{task['path']} "
+                  f"(попытка {attempt + 1} из {MAX_RETRIES}): {e}")
+            time.sleep(RETRY_DELAY)
+    else:
+        return False
+
+    try:
+        os.replace(part_path, path)
+        if sha256 and not blob_store.add_file(path, sha256):
+            print(f"sha256 не совпадает, файл будет скачан заново: {task['model_name']}/{task['path']}")
+            os.remove(path)
+            return False
+    except OSError as e:
+        print(f"Не удалось сохранить файл {task['model_name']}/{task['path']}: {e}")
+        return False
+    progress.file_done()
+    return True
+
+def download_all(tasks, max_workers=GLOBAL_WORKERS):
+    """Скачивает все файлы из общей очереди. Возвращает список не скачанных задач."""
+    stop_event.clear()  # Функцию можно вызывать повторно (например, после прерывания)
+    # Из файлов с одинаковым sha256 скачивается только первый, остальные получают ссылку на него
+    duplicates = []
+    if USE_BLOB_STORE:
+        unique, seen = [], set()
+        for task in tasks:
+            if task["sha256"] in seen:
+                duplicates.append(task)
+                continue
+            if task["sha256"]:
+                seen.add(task["sha256"])
+            unique.append(task)
+        tasks = unique
+        if duplicates:
+            print(f"Одинаковых файлов в разных моделях: {len(duplicates)}, "
+                  f"{sum(task['size'] for task in duplicates) / 1024 ** 3:.2f} GiB не будут скачаны повторно")
+
+    session = create_session()
+    bucket = TokenBucket(MAX_BANDWIDTH) if MAX_BANDWIDTH else None
+    progress = Progress(tasks)
+    # У вывода прогресса свое событие: stop_event прерывает загрузки
+    report_done = threading.Event()
+    threading.Thread(target=progress.report_periodically, args=(report_done,), daemon=True).start()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            # Пул берет задачи в порядке отправки, поэтому порядок очереди сохраняется
+            futures = [executor.submit(download_task, session, task, bucket, progress) for task in tasks]
+            results = [future.result() for future in futures]
+        except KeyboardInterrupt:
+            print("Прерывание: недокачанные файлы продолжатся при следующем запуске")
+            stop_event.set()
+            report_done.set()
+            executor.shutdown(cancel_futures=True)
+            raise
+    report_done.set()
+    progress.report()
+
+    failed = [task for task, ok in zip(tasks, results) if not ok]
+    for task in duplicates:
+        try:
+            if blob_store.has_blob(task["sha256"], task["size"]):
+                blob_store.link_into(task["sha256"], task["local_path"])
+                continue
+        except OSError as e:
+            print(f"Ошибка файловой системы {task['model_name']}/{task['path']}: {e}")
+        failed.append(task)
+    return failed
+
+def main():
+    api = HfApi()
+    tasks = []
+    for model_name in model_names:
+        output_dir = f"{base_output_dir}/{model_name.split('/')[-1]}"
+        model_tasks = list_model_files(api, model_name, output_dir)
+        model_size = sum(task["size"] for task in model_tasks)
+        print(f"Модель {model_name}: файлов {len(model_tasks)}, {model_size / 1024 ** 3:.2f} GiB")
+        tasks.extend(model_tasks)
+
+    tasks = order_tasks(tasks)
+    print(f"Всего файлов в очереди: {len(tasks)}, потоков: {GLOBAL_WORKERS}, порядок: {QUEUE_ORDER}")
+    failed = download_all(tasks)
+
+    failed_models = {task["model_name"] for task in failed}
+    for model_name in model_names:
+        output_dir = f"{base_output_dir}/{model_name.split('/')[-1]}"
+        if model_name in failed_models:
+            print(f"Модель {model_name} скачана не полностью, запустите скрипт повторно")
+        else:
+            print(f"Модель {model_name} успешно скачана в {output_dir}")
+
+    if not failed:
+        print("Все модели успешно скачаны.")
+
+if __name__ == "__main__":
+    main()
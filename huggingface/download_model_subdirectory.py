@@ -1,6 +1,8 @@
-from huggingface_hub import snapshot_download
+from huggingface_hub import HfApi
 import os
 
+from download_model import download_all, list_model_files, order_tasks
+
 NUM_THREADS = 3  # Количество потоков <button class="citation-flag" data-index="2">
 # SUBDIRECTORIES = [
 #     "Tess-3-Llama-3.1-405B-IQ2_M",
@@ -38,17 +40,17 @@ OUTPUT_DIR = "F://models//unsloth-Qwen3-235B-A22B-GGUF"
 # Создание базовой директории
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# Генерация шаблонов для фильтрации файлов
-allow_patterns = [f"{subdir}/*" for subdir in SUBDIRECTORIES]
+# Файлы указанных подкаталогов. Скачивание идет через общую очередь download_model.py:
+# LFS-файлы, уже скачанные для любой модели, берутся из хранилища blob_store.py
+api = HfApi()
+tasks = []
+for subdir in SUBDIRECTORIES:
+    tasks.extend(list_model_files(api, REPO_ID, OUTPUT_DIR, path_in_repo=subdir))
 
 # Скачивание с многопоточностью
-snapshot_download(
-    repo_id=REPO_ID,
-    allow_patterns=allow_patterns, 
-    local_dir=OUTPUT_DIR,
-    repo_type="model",
-    local_dir_use_symlinks=False,
-    max_workers=NUM_THREADS,
-)
+failed = download_all(order_tasks(tasks), max_workers=NUM_THREADS)
 
-print(f"Файлы из подкаталогов {SUBDIRECTORIES} успешно скачаны в {OUTPUT_DIR}")
\ No newline at end of file
+if failed:
+    print(f"Не скачано файлов: {len(failed)}, запустите скрипт повторно")
+else:
+    print(f"Файлы из подкаталогов {SUBDIRECTORIES} успешно скачаны в {OUTPUT_DIR}")
@@ -1,7 +1,8 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
+import json
 import time
+from urllib.parse import quote
+
+import requests
 
 # --- НАСТРОЙКИ ---
 HUGGINGFACE_BASE_URL = "https://huggingface.co"
@@ -15,14 +16,80 @@ SUBFOLDERS = ["Q4_K_M", "Q5_K_M", "Q6_K", "Q8_0"]  # несколько подк
 DOWNLOAD_ALL = True # создает ссылки на все файлы во всех подкаталогах, игнорируя SUBFOLDERS
 OUTPUT_FILE = "download_links.txt"
 
+# Способ получения списка файлов:
+# "api" - JSON API дерева репозитория (/api/models/<repo>/tree/main): пути, размеры и sha256
+#         всех файлов за один или несколько запросов; при ошибке API используется Selenium
+# "selenium" - разбор страниц сайта в headless Chrome
+LISTING_BACKEND = "api"
+
+# Ветка или коммит репозитория
+REVISION = "main"
+
+# Токен Hugging Face для закрытых репозиториев (None - без авторизации)
+HF_TOKEN = None
+
+# Файл со списком файлов (ссылка, путь, размер, sha256 для LFS-файлов), только для LISTING_BACKEND = "api"
+MANIFEST_FILE = "download_manifest.json"
+
+REQUEST_TIMEOUT = 60
+
+def list_repo_tree(model_repo, subfolder="", recursive=True):
+    """Возвращает файлы репозитория из API дерева (с переходом по страницам из заголовка Link)."""
+    url = f"{HUGGINGFACE_BASE_URL}/api/models/{model_repo}/tree/{REVISION}"
+    if subfolder:
+        url += "/" + quote(subfolder)
+    params = {"recursive": "true"} if recursive else {}
+    headers = {"Authorization": f"Bearer {HF_TOKEN}"} if HF_TOKEN else {}
+
+    files = []
+    with requests.Session() as session:
+        while url:
+            response = session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            for entry in response.json():
+                if entry.get("type") == "file":
+                    lfs = entry.get("lfs") or {}
+                    files.append({
+                        "url": f"{HUGGINGFACE_BASE_URL}/{model_repo}/resolve/{REVISION}/{quote(entry['path'])}?download=true",
+                        "path": entry["path"],
+                        "size": entry.get("size"),
+                        "sha256": lfs.get("oid"),  # Для обычных (не LFS) файлов oid - git-хеш, а не sha256
+                    })
+            # Следующая страница уже содержит параметры запроса
+            url = response.links.get("next", {}).get("url")
+            params = None
+    return files
+
+def list_files_api(model_repo, subfolders):
+    """Файлы из указанных подкаталогов через API (пустая строка - файлы корня без подкаталогов)."""
+    files = {}
+    for subfolder in subfolders:
+        print(f"Обработка подкаталога: '{subfolder if subfolder else 'корень'}'")
+        entries = list_repo_tree(model_repo, subfolder, recursive=bool(subfolder))
+        for entry in entries:
+            files.setdefault(entry["path"], entry)
+        print(f"  найдено файлов: {len(entries)}")
+    return list(files.values())
+
+def save_manifest(files, filename):
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump({"repo": MODEL_REPO, "revision": REVISION, "files": files}, f, indent=2, ensure_ascii=False)
+
+def create_driver():
+    """Запускает headless Chrome (Selenium импортируется только при необходимости)."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    return webdriver.Chrome(options=chrome_options)
+
 def get_download_links(model_repo, subfolder=""):
     if subfolder:
         url = f"{HUGGINGFACE_BASE_URL}/{model_repo}/tree/main/{subfolder}"
     else:
         url = f"{HUGGINGFACE_BASE_URL}/{model_repo}/tree/main"
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    driver = webdriver.Chrome(options=chrome_options)
+    from selenium.webdriver.common.by import By
+    driver = create_driver()
     driver.get(url)
     time.sleep(2)
 
@@ -60,9 +127,8 @@ def save_links_to_file(links, filename):
 def get_all_subfolders(model_repo):
     """Возвращает список всех подкаталогов в корне репозитория (включая пустую строку для корня)."""
     url = f"{HUGGINGFACE_BASE_URL}/{model_repo}/tree/main"
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    driver = webdriver.Chrome(options=chrome_options)
+    from selenium.webdriver.common.by import By
+    driver = create_driver()
     driver.get(url)
     time.sleep(2)
     
@@ -100,23 +166,38 @@ def get_all_subfolders(model_repo):
 
 if __name__ == "__main__":
     all_links = []
-    
-    if DOWNLOAD_ALL:
-        print("Режим 'скачать всё': получение списка всех подкаталогов...")
-        subfolders_to_process = get_all_subfolders(MODEL_REPO)
-        print(f"Найдено подкаталогов (включая корень): {len(subfolders_to_process)}")
+
+    # Если SUBFOLDERS пустой список, обрабатываем корень (пустая строка)
+    subfolders_to_process = SUBFOLDERS or [""]
+
+    files = None
+    if LISTING_BACKEND == "api":
+        try:
+            if DOWNLOAD_ALL:
+                # Один рекурсивный запрос возвращает файлы всех подкаталогов на любой глубине
+                print("Режим 'скачать всё': получение списка всех файлов через API...")
+                files = list_repo_tree(MODEL_REPO)
+            else:
+                files = list_files_api(MODEL_REPO, subfolders_to_process)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"API дерева репозитория недоступно ({e}), используем Selenium")
+
+    if files is not None:
+        all_links = [entry["url"] for entry in files]
+        save_manifest(files, MANIFEST_FILE)
+        total_size = sum(entry["size"] or 0 for entry in files)
+        print(f"Список файлов сохранён в {MANIFEST_FILE} (всего {total_size / 1024 ** 3:.2f} GiB)")
     else:
-        # Если SUBFOLDERS пустой список, обрабатываем корень (пустая строка)
-        if not SUBFOLDERS:
-            subfolders_to_process = [""]
-        else:
-            subfolders_to_process = SUBFOLDERS
-    
-    for subfolder in subfolders_to_process:
-        print(f"Обработка подкаталога: '{subfolder if subfolder else 'корень'}'")
-        links = get_download_links(MODEL_REPO, subfolder)
-        all_links.extend(links)
-        print(f"  найдено ссылок: {len(links)}")
-    
+        if DOWNLOAD_ALL:
+            print("Режим 'скачать всё': получение списка всех подкаталогов...")
+            subfolders_to_process = get_all_subfolders(MODEL_REPO)
+            print(f"Найдено подкаталогов (включая корень): {len(subfolders_to_process)}")
+
+        for subfolder in subfolders_to_process:
+            print(f"Обработка подкаталога: '{subfolder if subfolder else 'корень'}'")
+            links = get_download_links(MODEL_REPO, subfolder)
+            all_links.extend(links)
+            print(f"  найдено ссылок: {len(links)}")
+
     save_links_to_file(all_links, OUTPUT_FILE)
     print(f"Всего ссылок сохранено в файл {OUTPUT_FILE}: {len(all_links)}")
@@ -1,20 +1,125 @@
 import json
+import os
 import requests
+from requests.adapters import HTTPAdapter
+import threading
 import time
 import signal
 import sys
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from tqdm import tqdm
 
 DEPENDENCIES_FILE = "dependencies.json"
+# Журнал найденных артефактов: по одной JSON-строке на новый или изменившийся артефакт.
+# В конце загрузки журнал сворачивается в DEPENDENCIES_FILE
+DEPENDENCIES_JOURNAL_FILE = "dependencies.ndjson"
 PROGRESS_FILE = "fetch_progress.json"
+# Как часто (в артефактах) сохранять прогресс
+CHECKPOINT_EVERY = 5000
 BATCH_SIZE = 20
 MAVEN_SEARCH_URL = "https://search.maven.org/solrsearch/select"
 
+# Способ обхода каталога:
+# "partitions" - разбиение по префиксу groupId (g:org.apache.*): каждая часть небольшая,
+#                читается крупными страницами без глубокого start, части читаются параллельно;
+# "offset"     - старый способ: весь каталог q=*:* страницами по BATCH_SIZE с растущим start
+CRAWL_MODE = "partitions"
+# Размер страницы при обходе по частям
+PARTITION_ROWS = 200
+# Часть, в которой больше стольких артефактов, делится на более длинные префиксы
+PARTITION_MAX = 2000
+# Сколько частей читать одновременно
+CRAWL_WORKERS = 8
+# Общее ограничение частоты запросов ко всему search.maven.org (запросов в секунду)
+CRAWL_RATE_LIMIT = 5
+# Сколько раз повторять неудачный запрос
+CRAWL_MAX_RETRIES = 3
+# Журнал обхода по частям: какие части разделены и какие уже прочитаны.
+# Удаляется после полного обхода, поэтому следующий запуск - снова полное обновление
+PARTITIONS_PROGRESS_FILE = "crawl_partitions.jsonl"
+# Специальные символы синтаксиса запросов Solr
+SOLR_SPECIAL_CHARS = set('+-&|!(){}[]^"~*?:\\/ ')
+
+def escape_solr(value):
+    """Экранирует специальные символы Solr в значении запроса."""
+    return "".join("\\" + char if char in SOLR_SPECIAL_CHARS else char for char in value)
+
+def partition_query(partition):
+    """Строит запрос Solr для части каталога.
+
+    Часть - словарь: g - префикс (или точное значение при g_exact) groupId,
+    a - то же для artifactId (a_exact). Пустая часть - весь каталог.
+    """
+    terms = []
+    for field in ("g", "a"):
+        value = partition.get(field)
+        if partition.get(f"{field}_exact"):
+            terms.append(f"{field}:{escape_solr(value)}")
+        elif value:
+            terms.append(f"{field}:{escape_solr(value)}*")
+    return " AND ".join(terms) or "*:*"
+
+def split_field(partition):
+    """Поле, по которому делится часть: пока groupId задан префиксом - g, внутри одного groupId - a.
+
+    None, если часть уже не делится (заданы точные groupId и artifactId).
+    """
+    field = "a" if partition.get("g_exact") else "g"
+    return None if partition.get(f"{field}_exact") else field
+
+def split_partition(partition, counts):
+    """Делит часть по фасету: counts - {значение поля: число артефактов} для значений с префиксом части.
+
+    Значения группируются по следующему за префиксом символу; пустые группы не создаются,
+    а группа сразу получает общий префикс всех своих значений (цепочки с одним вариантом
+    продолжения схлопываются). Группа из одного значения становится точным значением.
+    """
+    field = split_field(partition)
+    if field is None:
+        return []
+    prefix = partition.get(field) or ""
+    children = []
+    groups = {}
+    for value, count in counts.items():
+        if count <= 0 or not value.startswith(prefix):
+            continue
+        if value == prefix:
+            children.append({**partition, field: prefix, f"{field}_exact": True})
+        else:
+            groups.setdefault(value[len(prefix)], []).append(value)
+    for char in sorted(groups):
+        values = groups[char]
+        if len(values) == 1:
+            children.append({**partition, field: values[0], f"{field}_exact": True})
+        else:
+            children.append({**partition, field: os.path.commonprefix(values)})
+    return children
+
+class RateLimiter:
+    """Общее для всех потоков ограничение частоты запросов."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
 class DependencyFetcher:
     def __init__(self):
         self.running = True
         self.progress = self.load_progress()
+        # Индекс артефактов по ключу "groupId:artifactId" (порядок добавления сохраняется)
+        self.artifacts = {}
+        self.journal = None
+        self.lock = threading.Lock()
         signal.signal(signal.SIGINT, self.handle_interrupt)
         
     def load_progress(self):
@@ -25,23 +130,60 @@ class DependencyFetcher:
             return {"current_start": 0, "total_found": None}
     
     def save_progress(self):
+        # Прогресс сохраняется только после того, как журнал записан на диск
+        if self.journal is not None:
+            self.journal.flush()
         with open(PROGRESS_FILE, 'w') as f:
             json.dump(self.progress, f)
     
     def load_dependencies(self):
+        """Загружает DEPENDENCIES_FILE и проигрывает поверх него журнал."""
         try:
             with open(DEPENDENCIES_FILE, 'r') as f:
-                return json.load(f)
+                for artifact in json.load(f)["artifacts"]:
+                    self.artifacts[f"{artifact['group_id']}:{artifact['artifact_id']}"] = artifact
         except FileNotFoundError:
-            return {"artifacts": [], "last_update": None}
+            pass
+        try:
+            with open(DEPENDENCIES_JOURNAL_FILE, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        artifact = json.loads(line)
+                    except ValueError:
+                        continue  # Недописанная строка после аварийного завершения
+                    self.artifacts[f"{artifact['group_id']}:{artifact['artifact_id']}"] = artifact
+        except FileNotFoundError:
+            pass
+        self.journal = open(DEPENDENCIES_JOURNAL_FILE, 'a', encoding='utf-8')
+        if self.journal.tell() > 0:
+            with open(DEPENDENCIES_JOURNAL_FILE, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.journal.write("\n")  # Завершаем недописанную строку
     
-    def save_dependencies(self, data):
-        with open(DEPENDENCIES_FILE, 'w') as f:
+    def add_artifact(self, artifact):
+        """Добавляет артефакт в индекс; новые и изменившиеся артефакты дописываются в журнал."""
+        key = f"{artifact['group_id']}:{artifact['artifact_id']}"
+        if self.artifacts.get(key) == artifact:
+            return
+        self.artifacts[key] = artifact
+        self.journal.write(json.dumps(artifact) + "\n")
+    
+    def save_dependencies(self):
+        """Сворачивает журнал в DEPENDENCIES_FILE (через временный файл) и очищает журнал."""
+        data = {"artifacts": list(self.artifacts.values()), "last_update": datetime.now().isoformat()}
+        tmp_file = DEPENDENCIES_FILE + ".tmp"
+        with open(tmp_file, 'w') as f:
             json.dump(data, f, indent=2)
+        os.replace(tmp_file, DEPENDENCIES_FILE)
+        self.journal.truncate(0)
+        self.journal.seek(0)
     
     def handle_interrupt(self, signum, frame):
         print("\nСохранение прогресса и завершение работы...")
         self.running = False
+        if CRAWL_MODE == "partitions":
+            return  # Потоки закончат текущие запросы, а прочитанные части уже отмечены в журнале
         self.save_progress()
         sys.exit(0)
     
@@ -58,7 +200,7 @@ class DependencyFetcher:
             self.progress["total_found"] = response.json()["response"]["numFound"]
             self.save_progress()
         
-        dependencies = self.load_dependencies()
+        self.load_dependencies()
         
         with tqdm(total=self.progress["total_found"], 
                  initial=self.progress["current_start"],
@@ -72,22 +214,19 @@ class DependencyFetcher:
                     data = response.json()
                     
                     for doc in data["response"]["docs"]:
-                        artifact = {
+                        self.add_artifact({
                             "group_id": doc["g"],
                             "artifact_id": doc["a"],
                             "latest_version": doc["latestVersion"]
-                        }
-                        if artifact not in dependencies["artifacts"]:
-                            dependencies["artifacts"].append(artifact)
+                        })
                     
                     self.progress["current_start"] += BATCH_SIZE
                     pbar.update(BATCH_SIZE)
                     
-                    # Сохраняем прогресс каждые 5000 артефактов
-                    if self.progress["current_start"] % 5000 == 0:
+                    # Сохраняем прогресс каждые CHECKPOINT_EVERY артефактов: журнал уже
+                    # дописан, поэтому контрольная точка не переписывает весь список
+                    if self.progress["current_start"] % CHECKPOINT_EVERY == 0:
                         self.save_progress()
-                        dependencies["last_update"] = datetime.now().isoformat()
-                        self.save_dependencies(dependencies)
                     
                     time.sleep(1)  # Задержка для избежания блокировки
                 
@@ -98,10 +237,170 @@ class DependencyFetcher:
                     continue
         
         if self.running:
-            dependencies["last_update"] = datetime.now().isoformat()
-            self.save_dependencies(dependencies)
-            print("\nЗагрузка списка зависимостей завершена!")
+            self.save_dependencies()
+            self.save_progress()
+            print(f"\nЗагрузка списка зависимостей завершена! Артефактов: {len(self.artifacts)}")
+
+    def create_session(self):
+        """Создает HTTP-сессию с пулом keep-alive соединений на CRAWL_WORKERS потоков."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CRAWL_WORKERS, pool_block=True)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request(self, params):
+        """Запрос к search.maven.org с общим ограничением частоты и повторами."""
+        query = params["q"]
+        for attempt in range(CRAWL_MAX_RETRIES):
+            self.rate_limiter.wait()
+            try:
+                response = self.session.get(MAVEN_SEARCH_URL, params=params, timeout=60)
+                response.raise_for_status()
+                return response.json()
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                if attempt == CRAWL_MAX_RETRIES - 1:
+                    raise
+                print(f"\nОшибка запроса {query!r} (попытка {attempt + 1} из {CRAWL_MAX_RETRIES}): {e}")
+                time.sleep(5)
+
+    def search(self, query, start, rows):
+        return self.request({"q": query, "start": start, "rows": rows, "wt": "json"})["response"]
+
+    def facet_counts(self, partition, field):
+        """Число артефактов для каждого значения поля с префиксом части - одним запросом."""
+        params = {
+            "q": partition_query(partition), "rows": 0, "wt": "json",
+            "facet": "true", "facet.field": field, "facet.limit": -1, "facet.mincount": 1,
+        }
+        if partition.get(field):
+            params["facet.prefix"] = partition[field]
+        data = self.request(params)
+        values = data["facet_counts"]["facet_fields"][field]
+        # Solr возвращает плоский список [значение, количество, значение, количество, ...]
+        return dict(zip(values[::2], values[1::2]))
+
+    def load_partitions(self):
+        """Проигрывает журнал обхода: возвращает (разделенные части, прочитанные части)."""
+        split, done = {}, set()
+        try:
+            with open(PARTITIONS_PROGRESS_FILE, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Недописанная строка после аварийного завершения
+                    if record["status"] == "split":
+                        split[record["query"]] = record["children"]
+                    else:
+                        done.add(record["query"])
+        except FileNotFoundError:
+            pass
+        return split, done
+
+    def crawl_partition(self, partition):
+        """Читает одну часть каталога.
+
+        Возвращает (дочерние части, количество артефактов): если часть слишком
+        большая, она не читается, а делится.
+        """
+        query = partition_query(partition)
+        response = self.search(query, 0, PARTITION_ROWS)
+        found = response["numFound"]
+        field = split_field(partition)
+        if found > PARTITION_MAX and field:
+            children = split_partition(partition, self.facet_counts(partition, field))
+            if children:
+                return children, 0
+        docs = response["docs"]
+        start = len(docs)
+        while self.running and start < found:
+            page = self.search(query, start, PARTITION_ROWS)["docs"]
+            if not page:
+                break
+            docs.extend(page)
+            start += len(page)
+        if not self.running:
+            return None, 0
+        with self.lock:
+            for doc in docs:
+                self.add_artifact({
+                    "group_id": doc["g"],
+                    "artifact_id": doc["a"],
+                    "latest_version": doc["latestVersion"]
+                })
+        return [], len(docs)
+
+    def fetch_artifacts_partitioned(self):
+        """Обходит каталог по частям (префиксам groupId/artifactId) в CRAWL_WORKERS потоков.
+
+        Каждая часть читается целиком крупными страницами и отмечается в журнале
+        PARTITIONS_PROGRESS_FILE, поэтому после прерывания повторно читаются
+        только незавершенные части.
+        """
+        self.session = self.create_session()
+        self.rate_limiter = RateLimiter(CRAWL_RATE_LIMIT)
+        self.load_dependencies()
+
+        split, done = self.load_partitions()
+        # Разворачиваем уже разделенные части до листьев, которые еще не прочитаны
+        pending = []
+        stack = [{}]
+        while stack:
+            partition = stack.pop()
+            query = partition_query(partition)
+            if query in split:
+                stack.extend(split[query])
+            elif query not in done:
+                pending.append(partition)
+
+        total = self.search("*:*", 0, 0)["numFound"]
+        partitions_journal = open(PARTITIONS_PROGRESS_FILE, 'a', encoding='utf-8')
+        failed = 0
+        with tqdm(total=total, desc="Загрузка артефактов") as pbar, \
+                ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as executor:
+            running = {}
+            while self.running and (pending or running):
+                while pending and len(running) < CRAWL_WORKERS * 2:
+                    partition = pending.pop()
+                    running[executor.submit(self.crawl_partition, partition)] = partition
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    partition = running.pop(future)
+                    query = partition_query(partition)
+                    try:
+                        children, count = future.result()
+                    except Exception as e:
+                        print(f"\nНе удалось прочитать часть {query!r}: {e}")
+                        failed += 1
+                        continue
+                    if children is None:
+                        continue  # Остановка: часть будет прочитана при следующем запуске
+                    if children:
+                        record = {"query": query, "status": "split", "children": children}
+                        pending.extend(children)
+                    else:
+                        # Часть отмечается прочитанной только после того, как ее артефакты записаны в журнал
+                        with self.lock:
+                            self.journal.flush()
+                        record = {"query": query, "status": "done"}
+                        pbar.update(count)
+                    partitions_journal.write(json.dumps(record) + "\n")
+                    partitions_journal.flush()
+        partitions_journal.close()
+
+        if not self.running:
+            return
+        self.save_dependencies()
+        if failed:
+            print(f"\nНе прочитано частей: {failed}, запустите скрипт повторно, чтобы дочитать их")
+            return
+        os.remove(PARTITIONS_PROGRESS_FILE)
+        print(f"\nЗагрузка списка зависимостей завершена! Артефактов: {len(self.artifacts)}")
 
 if __name__ == "__main__":
     fetcher = DependencyFetcher()
-    fetcher.fetch_artifacts()
+    if CRAWL_MODE == "partitions":
+        fetcher.fetch_artifacts_partitioned()
+    else:
+        fetcher.fetch_artifacts()
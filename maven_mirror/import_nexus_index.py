@@ -0,0 +1,282 @@
+import gzip
+import json
+import os
+import sqlite3
+import struct
+import requests
+from datetime import datetime
+from itertools import groupby
+
+from maven_version import is_prerelease, version_key
+
+# Скрипт строит список артефактов Maven Central по официальному индексу
+# (nexus-maven-repository-index): один большой файл со всеми groupId/artifactId/версиями,
+# размерами и SHA-1, плюс небольшие инкрементальные файлы с изменениями.
+# Первый запуск скачивает полный индекс, следующие - только новые инкрементальные части.
+
+# Каталог индекса Maven Central
+INDEX_URL = "https://repo1.maven.org/maven2/.index/"
+INDEX_NAME = "nexus-maven-repository-index"
+
+# Каталог для скачанных файлов индекса
+INDEX_CACHE_DIR = "nexus_index"
+
+# База со всеми версиями (основные артефакты без classifier): g, a, v, packaging, дата, размер, SHA-1
+INDEX_DB_FILE = "nexus_index.sqlite"
+
+# Файлы, в которые записывается список последних версий (формат dependencies.json).
+# updated_dependencies.json читает maven_mirror.py
+DEPENDENCIES_FILE = "dependencies.json"
+UPDATED_DEPENDENCIES_FILE = "updated_dependencies.json"
+
+# Изменения последних версий по сравнению с прошлым DEPENDENCIES_FILE
+CHANGED_VERSIONS_FILE = "changed_versions.json"
+
+# Удалять скачанные файлы индекса после разбора
+DELETE_INDEX_FILES = True
+
+# Не выбирать последней версией alpha/beta/milestone/rc/snapshot, если есть релизы
+SKIP_PRERELEASES = True
+
+# Сколько строк записывать в базу за одну транзакцию
+DB_BATCH_SIZE = 50000
+
+def parse_properties(text):
+    """Разбирает файл .properties (ключ=значение, комментарии с #)."""
+    properties = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", "!")):
+            continue
+        key, _, value = line.partition("=")
+        properties[key.strip()] = value.strip().replace("\\:", ":")
+    return properties
+
+def read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError("Unexpected end of index file")
+    return data
+
+def read_index_documents(path):
+    """Читает документы файла индекса по одному.
+
+    Формат (IndexDataWriter из maven-indexer): байт версии (1), long время создания,
+    затем документы: int число полей, для каждого поля байт флагов, имя
+    (unsigned short длина + UTF-8) и значение (int длина + UTF-8).
+    Документ возвращается как словарь {имя поля: значение}.
+    """
+    with gzip.open(path, 'rb') as f:
+        version, _timestamp = struct.unpack(">bq", read_exact(f, 9))
+        if version != 1:
+            raise ValueError(f"{path}: unsupported index version {version}")
+        while True:
+            header = f.read(4)
+            if not header:
+                return
+            if len(header) != 4:
+                raise EOFError("Unexpected end of index file")
+            (field_count,) = struct.unpack(">i", header)
+            document = {}
+            for _ in range(field_count):
+                _flags, name_length = struct.unpack(">bH", read_exact(f, 3))
+                name = read_exact(f, name_length).decode('utf-8', 'replace')
+                (value_length,) = struct.unpack(">i", read_exact(f, 4))
+                document[name] = read_exact(f, value_length).decode('utf-8', 'replace')
+            yield document
+
+def parse_uinfo(uinfo):
+    """Разбирает поле UINFO "g|a|v|classifier|extension" (classifier "NA" - без classifier)."""
+    parts = uinfo.split("|")
+    if len(parts) < 4:
+        return None
+    group_id, artifact_id, version, classifier = parts[:4]
+    return group_id, artifact_id, version, None if classifier == "NA" else classifier
+
+def document_rows(path):
+    """Преобразует документы индекса в операции над базой.
+
+    Возвращает пары ("add", строка) и ("del", (g, a, v)). Учитываются только
+    основные артефакты (без classifier): -sources, -javadoc и т.п. скачивает maven_mirror.py.
+    """
+    for document in read_index_documents(path):
+        if "del" in document:
+            gav = parse_uinfo(document["del"])
+            if gav and gav[3] is None:
+                yield "del", gav[:3]
+            continue
+        if "u" not in document:
+            continue  # Служебные документы (DESCRIPTOR, allGroups, rootGroups)
+        gav = parse_uinfo(document["u"])
+        if not gav or gav[3] is not None:
+            continue
+        # INFO: packaging|lastModified|size|sourcesExists|javadocExists|signatureExists|extension
+        info = document.get("i", "").split("|")
+        packaging = info[0] if info and info[0] != "NA" else None
+        last_modified = int(info[1]) if len(info) > 1 and info[1].lstrip("-").isdigit() else 0
+        size = int(info[2]) if len(info) > 2 and info[2].lstrip("-").isdigit() and int(info[2]) >= 0 else None
+        yield "add", (*gav[:3], packaging, last_modified, size, document.get("1"))
+
+def open_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS versions (
+            group_id TEXT NOT NULL,
+            artifact_id TEXT NOT NULL,
+            version TEXT NOT NULL,
+            packaging TEXT,
+            last_modified INTEGER,
+            size INTEGER,
+            sha1 TEXT,
+            PRIMARY KEY (group_id, artifact_id, version)
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    return conn
+
+def get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+def apply_index_file(conn, path):
+    """Применяет файл индекса (полный или инкрементальный) к базе."""
+    added = deleted = 0
+    batch_add, batch_del = [], []
+
+    def flush():
+        conn.executemany("INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?, ?, ?, ?)", batch_add)
+        conn.executemany("DELETE FROM versions WHERE group_id = ? AND artifact_id = ? AND version = ?", batch_del)
+        conn.commit()
+        batch_add.clear()
+        batch_del.clear()
+
+    for operation, row in document_rows(path):
+        if operation == "add":
+            batch_add.append(row)
+            added += 1
+        else:
+            # Удаление и добавление в одном файле должны примениться по порядку
+            if batch_add:
+                flush()
+            batch_del.append(row)
+            deleted += 1
+        if len(batch_add) + len(batch_del) >= DB_BATCH_SIZE:
+            flush()
+    flush()
+    print(f"{os.path.basename(path)}: добавлено {added}, удалено {deleted}")
+
+def download_index_file(session, name):
+    """Скачивает файл индекса в INDEX_CACHE_DIR (через временный файл)."""
+    os.makedirs(INDEX_CACHE_DIR, exist_ok=True)
+    path = os.path.join(INDEX_CACHE_DIR, name)
+    url = INDEX_URL + name
+    print(f"Скачивание {url}")
+    with session.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(path + ".part", 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    os.replace(path + ".part", path)
+    return path
+
+def apply_downloaded(conn, session, name):
+    path = download_index_file(session, name)
+    apply_index_file(conn, path)
+    if DELETE_INDEX_FILES:
+        os.remove(path)
+
+def update_db(conn, session):
+    """Приводит базу к текущему индексу: инкрементальными частями, если возможно, иначе полностью."""
+    response = session.get(f"{INDEX_URL}{INDEX_NAME}.properties", timeout=60)
+    response.raise_for_status()
+    properties = parse_properties(response.text)
+    chain_id = properties.get("nexus.index.chain-id")
+    last_incremental = int(properties.get("nexus.index.last-incremental", -1))
+    available = {int(value) for key, value in properties.items() if key.startswith("nexus.index.incremental-")}
+
+    local_chain_id = get_meta(conn, "chain_id")
+    local_incremental = int(get_meta(conn, "last_incremental") or -1)
+
+    needed = list(range(local_incremental + 1, last_incremental + 1))
+    if local_chain_id == chain_id and local_incremental >= 0 and set(needed) <= available:
+        if not needed:
+            print("Индекс не изменился")
+        for number in needed:
+            apply_downloaded(conn, session, f"{INDEX_NAME}.{number}.gz")
+            set_meta(conn, "last_incremental", number)
+            conn.commit()
+    else:
+        print("Полная загрузка индекса")
+        conn.execute("DELETE FROM versions")
+        conn.execute("DELETE FROM meta")
+        conn.commit()
+        # На время первоначальной загрузки отключаем синхронную запись: при сбое база все равно строится заново
+        conn.execute("PRAGMA synchronous=OFF")
+        apply_downloaded(conn, session, f"{INDEX_NAME}.gz")
+        conn.execute("PRAGMA synchronous=FULL")
+        set_meta(conn, "chain_id", chain_id)
+        set_meta(conn, "last_incremental", last_incremental)
+        conn.commit()
+    set_meta(conn, "timestamp", properties.get("nexus.index.timestamp", ""))
+    conn.commit()
+
+def latest_versions(conn):
+    """Последняя версия каждого groupId:artifactId по правилам сравнения версий Maven.
+
+    Дата публикации не учитывается: исправление 1.2.9, выпущенное после 2.0.0,
+    не считается последней версией. Как и в maven_mirror_with_version_check.py,
+    предварительные версии пропускаются, если у артефакта есть релизы.
+    """
+    rows = conn.execute("SELECT group_id, artifact_id, version FROM versions ORDER BY group_id, artifact_id")
+    artifacts = []
+    for (group_id, artifact_id), group in groupby(rows, key=lambda row: row[:2]):
+        versions = [row[2] for row in group]
+        if SKIP_PRERELEASES:
+            versions = [v for v in versions if not is_prerelease(v)] or versions
+        artifacts.append({"group_id": group_id, "artifact_id": artifact_id,
+                          "latest_version": max(versions, key=version_key)})
+    return artifacts
+
+def load_previous_versions():
+    try:
+        with open(DEPENDENCIES_FILE, "r", encoding="utf-8") as f:
+            artifacts = json.load(f)["artifacts"]
+    except FileNotFoundError:
+        return None
+    return {(a["group_id"], a["artifact_id"]): a["latest_version"] for a in artifacts}
+
+def write_json(path, data):
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_file, path)
+
+def main():
+    session = requests.Session()
+    conn = open_db(INDEX_DB_FILE)
+    update_db(conn, session)
+
+    artifacts = latest_versions(conn)
+    print(f"Артефактов в индексе: {len(artifacts)}")
+
+    previous = load_previous_versions()
+    if previous is not None:
+        changed = [
+            {"group_id": a["group_id"], "artifact_id": a["artifact_id"],
+             "old_version": previous.get((a["group_id"], a["artifact_id"])), "new_version": a["latest_version"]}
+            for a in artifacts if previous.get((a["group_id"], a["artifact_id"])) != a["latest_version"]
+        ]
+        if changed:
+            write_json(CHANGED_VERSIONS_FILE, {"changed_artifacts": changed})
+            print(f"Изменилось версий: {len(changed)}, список сохранён в {CHANGED_VERSIONS_FILE}")
+
+    write_json(DEPENDENCIES_FILE, {"artifacts": artifacts, "last_update": datetime.now().isoformat()})
+    write_json(UPDATED_DEPENDENCIES_FILE, {"artifacts": artifacts})
+    print(f"Список сохранён в {DEPENDENCIES_FILE} и {UPDATED_DEPENDENCIES_FILE}")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import re
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import formatdate
+
+# Общая очередь задач лежит в каталоге common репозитория
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from work_queue import WorkQueue
 
 # Базовый URL Maven Central
 BASE_URL = "https://repo1.maven.org/maven2/"
@@ -18,6 +28,59 @@ RETRY_DELAY = 5
 # Индекс артефакта, с которого начинать скачивание (начиная с 0)
 START_ARTIFACT_INDEX = 0  # Измените это значение на нужное
 
+# Общая очередь задач (файл SQLite). Если указана, список артефактов один раз переносится
+# в очередь, и ее могут параллельно разбирать несколько процессов или машин (с общим томом):
+# артефакт берется в аренду, а после падения исполнителя аренда истекает и его забирает
+# другой. START_ARTIFACT_INDEX в этом режиме не нужен
+WORK_QUEUE_FILE = None  # Например, "maven_queue.sqlite"
+
+# Сколько артефактов скачивать одновременно
+MAX_WORKERS = 8
+
+# Максимум одновременных соединений к одному хосту
+MAX_CONNECTIONS_PER_HOST = 8
+
+# Таймаут соединения и чтения (в секундах)
+REQUEST_TIMEOUT = 60
+
+# Как определять файлы версии:
+# "listing" - один запрос списка файлов каталога версии (скачиваются все реально существующие
+#             файлы, включая classifier вроде -linux-x86_64 и расширения .aar, .war, .zip);
+# "guess"   - перебор стандартных имен (.jar, .pom, -sources.jar, -javadoc.jar, .module)
+FILE_DISCOVERY = "listing"
+
+# Какие classifier скачивать: None - все, иначе список ("" - основной файл без classifier),
+# например ["", "sources", "javadoc"]
+CLASSIFIERS = None
+
+# Какие расширения скачивать: None - все, кроме EXCLUDED_EXTENSIONS
+EXTENSIONS = None
+
+# Расширения, которые не скачиваются (контрольные суммы и подписи)
+EXCLUDED_EXTENSIONS = ["md5", "sha1", "sha256", "sha512", "asc"]
+
+# Строка списка файлов repo1.maven.org:
+# <a href="name.jar" title="name.jar">name.jar</a>       2021-02-26 16:57     1305431
+LISTING_ENTRY_PATTERN = re.compile(r'<a href="([^"/?:][^"/]*)"[^>]*>[^<]*</a>\s+\d{4}-\d{2}-\d{2} \d{2}:\d{2}\s+(\d+)')
+
+# Флаг остановки для рабочих потоков (Ctrl+C)
+stop_event = threading.Event()
+
+def create_session():
+    """Создает общую HTTP-сессию с пулом keep-alive соединений.
+
+    pool_block=True не дает открыть к одному хосту больше
+    MAX_CONNECTIONS_PER_HOST соединений: лишние потоки ждут свободное.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONNECTIONS_PER_HOST, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Общая сессия для всех потоков
+session = create_session()
+
 def sanitize_filename(filename):
     """Заменяет недопустимые символы в именах файлов на допустимые."""
     invalid_chars = ':*?"<>|'
@@ -29,59 +92,71 @@ def sanitize_path(path):
     """Заменяет недопустимые символы в пути."""
     return sanitize_filename(path).replace('"', '')
 
-def file_exists(url):
-    """Проверяет, существует ли файл по указанному URL."""
-    try:
-        response = requests.head(url)
-        return response.status_code == 200
-    except requests.exceptions.RequestException:
-        return False
+def download_file(url, path, mutable=False, expected_size=None):
+    """Скачивает файл одним условным GET-запросом (без отдельных HEAD).
 
-def get_file_size(url):
-    """Возвращает размер файла на сервере."""
-    try:
-        response = requests.head(url)
-        if response.status_code == 200:
-            return int(response.headers.get("Content-Length", 0))
-        return 0
-    except requests.exceptions.RequestException:
-        return 0
-
-def download_file(url, path):
-    """Скачивает файл по URL и сохраняет его в указанный путь с поддержкой продолжения."""
+    Для неизменяемых файлов артефакта запрашивается только недостающая часть (Range):
+    ответ 416 означает, что локальный файл уже полный, 206 - докачку, 200 - файл целиком.
+    Если размер файла известен из списка каталога (expected_size) и локальный файл
+    такого же размера, запрос не делается.
+    Изменяемые файлы (maven-metadata.xml) запрашиваются с If-Modified-Since
+    и записываются через временный файл.
+    Возвращает "downloaded", "unchanged" или "not_found".
+    """
     # Санитизируем путь перед созданием директорий
     sanitized_path = sanitize_path(path)
     os.makedirs(os.path.dirname(sanitized_path), exist_ok=True)
-    
-    # Проверяем, существует ли файл и его размер
-    if os.path.exists(sanitized_path):
-        downloaded_size = os.path.getsize(sanitized_path)
-        file_size = get_file_size(url)
-        if downloaded_size == file_size:
-            print(f"Файл уже скачан: {url}")
-            return  # Файл уже полностью скачан
-    else:
-        downloaded_size = 0
 
-    # Устанавливаем заголовок Range для продолжения загрузки
-    headers = {"Range": f"bytes={downloaded_size}-"} if downloaded_size > 0 else {}
+    if expected_size is not None and os.path.exists(sanitized_path):
+        local_size = os.path.getsize(sanitized_path)
+        if local_size == expected_size:
+            print(f"Файл уже скачан: {url}")
+            return "unchanged"
+        if local_size > expected_size:
+            os.remove(sanitized_path)  # Локальный файл больше серверного - скачиваем заново
 
     for attempt in range(MAX_RETRIES):
+        downloaded_size = os.path.getsize(sanitized_path) if os.path.exists(sanitized_path) else 0
+        headers = {}
+        if downloaded_size > 0:
+            if mutable:
+                headers["If-Modified-Since"] = formatdate(os.path.getmtime(sanitized_path), usegmt=True)
+            else:
+                # Заголовок Range для продолжения загрузки
+                headers["Range"] = f"bytes={downloaded_size}-"
         try:
-            with requests.get(url, headers=headers, stream=True) as r:
+            with session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as r:
+                if r.status_code == 404:
+                    return "not_found"
+                if r.status_code == 304:
+                    print(f"Файл не изменился: {url}")
+                    return "unchanged"
+                if r.status_code == 416:
+                    # Запрошен диапазон за концом файла: Content-Range содержит "bytes */<размер>"
+                    if r.headers.get("Content-Range", "").rpartition("/")[2] == str(downloaded_size):
+                        print(f"Файл уже скачан: {url}")
+                        return "unchanged"
+                    # Локальный файл не совпадает с серверным - скачиваем заново
+                    print(f"Размер локального файла не совпадает с сервером, скачиваем заново: {url}")
+                    os.remove(sanitized_path)
+                    continue
                 r.raise_for_status()
                 # Проверяем, поддерживает ли сервер продолжение загрузки
                 if r.status_code == 206:  # 206 - Partial Content
                     print(f"Продолжение загрузки: {url} (с {downloaded_size} байт)")
-                    mode = "ab"  # Дописываем в конец файла
+                    target_path, mode = sanitized_path, "ab"  # Дописываем в конец файла
                 else:
                     print(f"Начало загрузки: {url}")
+                    # Изменяемый файл не должен остаться недописанным: с новым mtime он бы считался актуальным
+                    target_path = sanitized_path + ".part" if mutable else sanitized_path
                     mode = "wb"  # Перезаписываем файл
 
-                with open(sanitized_path, mode) as f:
-                    for chunk in r.iter_content(chunk_size=8192):
+                with open(target_path, mode) as f:
+                    for chunk in r.iter_content(chunk_size=65536):
                         f.write(chunk)
-                return  # Успешное скачивание
+                if target_path != sanitized_path:
+                    os.replace(target_path, sanitized_path)
+                return "downloaded"  # Успешное скачивание
         except requests.exceptions.RequestException as e:
             print(f"Ошибка при скачивании (попытка {attempt + 1} из {MAX_RETRIES}): {url}")
             print(f"Ошибка: {e}")
@@ -89,48 +164,202 @@ def download_file(url, path):
                 time.sleep(RETRY_DELAY)
             else:
                 raise  # Повторные попытки исчерпаны
+    raise requests.exceptions.RetryError(f"Не удалось скачать за {MAX_RETRIES} попыток: {url}")
 
-def download_artifact(group_id, artifact_id, version):
-    """Скачивает артефакт (JAR, POM, источники, документацию и метаданные)."""
+def split_artifact_file(file, artifact_id, version):
+    """Разбирает имя файла версии на (classifier, расширение).
+
+    commons-io-2.11.0-sources.jar -> ("sources", "jar"), commons-io-2.11.0.pom.sha1 -> ("", "pom.sha1").
+    Для файлов с чужим префиксом возвращает None.
+    """
+    prefix = f"{artifact_id}-{version}"
+    if not file.startswith(prefix):
+        return None
+    rest = file[len(prefix):]
+    if rest.startswith("."):
+        return "", rest[1:]
+    if rest.startswith("-"):
+        classifier, _, extension = rest[1:].partition(".")
+        return classifier, extension
+    return None
+
+def is_wanted_file(classifier, extension):
+    """Проверяет файл по правилам CLASSIFIERS / EXTENSIONS / EXCLUDED_EXTENSIONS."""
+    if CLASSIFIERS is not None and classifier not in CLASSIFIERS:
+        return False
+    if extension.rpartition(".")[2] in EXCLUDED_EXTENSIONS:
+        return False
+    return EXTENSIONS is None or extension in EXTENSIONS
+
+def list_version_files(base_path, artifact_id, version):
+    """Возвращает [(имя файла, размер)] по списку файлов каталога версии (None, если каталога нет).
+
+    Если в странице не найдено ни одного файла (список другого формата, например
+    у прокси Nexus или Artifactory), выбрасывает ValueError.
+    """
+    url = f"{BASE_URL}{base_path}"
+    response = session.get(url, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    entries = LISTING_ENTRY_PATTERN.findall(response.text)
+    if not entries:
+        raise ValueError("в списке каталога не найдено ни одного файла (неизвестный формат страницы)")
+    files = []
+    for file, size in entries:
+        parts = split_artifact_file(file, artifact_id, version)
+        if parts is not None and is_wanted_file(*parts):
+            files.append((file, int(size)))
+    return files
+
+def guess_version_files(artifact_id, version):
+    """Стандартный набор файлов версии (без проверки на сервере, размер неизвестен)."""
+    files = [
+        f"{artifact_id}-{version}.jar",
+        f"{artifact_id}-{version}.pom",
+        f"{artifact_id}-{version}-sources.jar",
+        f"{artifact_id}-{version}-javadoc.jar",
+        f"{artifact_id}-{version}.module",  # Модульные метаданные (если есть)
+    ]
+    return [(file, None) for file in files if is_wanted_file(*split_artifact_file(file, artifact_id, version))]
+
+def download_version_files(group_id, artifact_id, version):
+    """Скачивает файлы версии артефакта (с учетом CLASSIFIERS и EXTENSIONS).
+
+    Набор файлов берется из списка каталога версии (FILE_DISCOVERY = "listing"),
+    поэтому на каждый реально существующий файл тратится не больше одного запроса.
+    Возвращает False, если версии нет на сервере, ни один ее файл не найден
+    или какой-то из существующих файлов скачать не удалось.
+    """
+    ok = True
     # Санитизируем версию (удаляем кавычки)
     sanitized_version = sanitize_path(version)
     base_path = f"{group_id.replace('.', '/')}/{artifact_id}/{sanitized_version}/"
-    files = [
-        f"{artifact_id}-{sanitized_version}.jar",
-        f"{artifact_id}-{sanitized_version}.pom",
-        f"{artifact_id}-{sanitized_version}-sources.jar",
-        f"{artifact_id}-{sanitized_version}-javadoc.jar",
-        f"{artifact_id}-{sanitized_version}.module",  # Модульные метаданные (если есть)
-    ]
-    
-    # Скачиваем основные файлы
-    for file in files:
+
+    files = None
+    if FILE_DISCOVERY == "listing":
+        try:
+            files = list_version_files(base_path, artifact_id, sanitized_version)
+            if files is None:
+                print(f"Версия не найдена: {group_id}:{artifact_id}:{version}")
+                return False
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Не удалось получить список файлов {BASE_URL}{base_path}, используем стандартные имена: {e}")
+    if files is None:
+        files = guess_version_files(artifact_id, sanitized_version)
+
+    # Скачиваем файлы версии
+    found = False
+    for file, size in files:
+        if stop_event.is_set():
+            return False
         url = f"{BASE_URL}{base_path}{file}"
         # Очищаем имя файла от недопустимых символов
         sanitized_file = sanitize_filename(file)
         path = os.path.join(DOWNLOAD_DIR, "maven2", base_path.replace('/', os.sep), sanitized_file)
-        
-        # Проверяем, существует ли файл на сервере
-        if file_exists(url):
-            try:
-                download_file(url, path)
-            except requests.exceptions.RequestException:
-                print(f"Не удалось скачать: {url}")
-        else:
-            print(f"Файл не найден: {url}")
+
+        try:
+            if download_file(url, path, expected_size=size) == "not_found":
+                print(f"Файл не найден: {url}")
+            else:
+                found = True
+        except (requests.exceptions.RequestException, OSError):
+            print(f"Не удалось скачать: {url}")
+            ok = False
+    if files and not found and ok:
+        print(f"Ни один файл версии не найден: {group_id}:{artifact_id}:{version}")
+        return False
+    return ok
+
+def download_artifact(group_id, artifact_id, version):
+    """Скачивает файлы версии артефакта и maven-metadata.xml.
+
+    Возвращает False, если какой-то из существующих файлов скачать не удалось.
+    """
+    ok = download_version_files(group_id, artifact_id, version)
 
     # Скачиваем maven-metadata.xml
     metadata_url = f"{BASE_URL}{group_id.replace('.', '/')}/{artifact_id}/maven-metadata.xml"
     metadata_path = os.path.join(DOWNLOAD_DIR, "maven2", group_id.replace('.', os.sep), artifact_id, "maven-metadata.xml")
-    if file_exists(metadata_url):
+    try:
+        if download_file(metadata_url, metadata_path, mutable=True) == "not_found":
+            print(f"Метаданные не найдены: {metadata_url}")
+    except (requests.exceptions.RequestException, OSError):
+        print(f"Не удалось скачать метаданные: {metadata_url}")
+        ok = False
+    return ok
+
+def download_artifacts(artifacts, start=0, total=None, max_workers=MAX_WORKERS):
+    """Скачивает артефакты параллельно в пуле из max_workers потоков.
+
+    В очереди пула держится не больше 2 * max_workers задач.
+    """
+    total = total or len(artifacts)
+    pending = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
         try:
-            download_file(metadata_url, metadata_path)
-        except requests.exceptions.RequestException:
-            print(f"Не удалось скачать метаданные: {metadata_url}")
-    else:
-        print(f"Метаданные не найдены: {metadata_url}")
+            for index, artifact in enumerate(artifacts, start=start):
+                if len(pending) >= max_workers * 2:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                group_id = artifact["group_id"]
+                artifact_id = artifact["artifact_id"]
+                latest_version = artifact["latest_version"]
+                print(f"Скачивание артефакта {index + 1}/{total}: {group_id}:{artifact_id}:{latest_version}")
+                pending.add(executor.submit(download_artifact, group_id, artifact_id, latest_version))
+            wait(pending)
+        except KeyboardInterrupt:
+            print("Прерывание: дожидаемся уже начатых загрузок...")
+            stop_event.set()
+            executor.shutdown(cancel_futures=True)
+            raise
+
+def download_from_queue(queue, max_workers=MAX_WORKERS):
+    """Разбирает общую очередь в max_workers потоков, пока в ней есть свободные артефакты."""
+    def worker():
+        while not stop_event.is_set():
+            claimed = queue.claim()
+            if not claimed:
+                return
+            key, artifact = claimed[0]
+            print(f"Скачивание артефакта из очереди: {key}")
+            if download_artifact(artifact["group_id"], artifact["artifact_id"], artifact["latest_version"]):
+                if not queue.complete(key):
+                    print(f"Аренда артефакта {key} потеряна, его уже взял другой исполнитель")
+            elif not stop_event.is_set():
+                queue.release(key)  # Вернем в очередь для повторной попытки
+            else:
+                # При остановке артефакт не возвращаем: аренда истечет, и его заберет другой исполнитель
+                queue.abandon(key)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(worker) for _ in range(max_workers)]
+        try:
+            wait(futures)
+        except KeyboardInterrupt:
+            print("Прерывание: дожидаемся уже начатых загрузок...")
+            stop_event.set()
+            raise
+    print(f"Состояние очереди: {queue.counts()}")
 
 def main():
+    if WORK_QUEUE_FILE:
+        queue = WorkQueue(WORK_QUEUE_FILE)
+        try:
+            # Список добавляет каждый исполнитель: уже известные ключи пропускаются, поэтому
+            # новые артефакты из DEPENDENCIES_FILE попадают и в уже разобранную очередь
+            with open(DEPENDENCIES_FILE, "r", encoding="utf-8") as f:
+                dependencies = json.load(f)
+            added = queue.add(
+                (f"{artifact['group_id']}:{artifact['artifact_id']}:{artifact['latest_version']}",
+                 {key: artifact[key] for key in ("group_id", "artifact_id", "latest_version")})
+                for artifact in dependencies["artifacts"]
+            )
+            print(f"Добавлено в очередь артефактов: {added}")
+            download_from_queue(queue)
+        finally:
+            queue.close()
+        return
+
     # Загружаем зависимости из файла dependencies.json
     with open(DEPENDENCIES_FILE, "r", encoding="utf-8") as f:
         dependencies = json.load(f)
@@ -140,14 +369,8 @@ def main():
     print(f"Общее количество артефактов: {total_artifacts}")
 
     # Скачиваем артефакты, начиная с указанного индекса
-    for index, artifact in enumerate(dependencies["artifacts"]):
-        if index < START_ARTIFACT_INDEX:
-            continue  # Пропускаем артефакты до указанного индекса
-        group_id = artifact["group_id"]
-        artifact_id = artifact["artifact_id"]
-        latest_version = artifact["latest_version"]
-        print(f"Скачивание артефакта {index + 1}/{total_artifacts}: {group_id}:{artifact_id}:{latest_version}")
-        download_artifact(group_id, artifact_id, latest_version)
+    download_artifacts(dependencies["artifacts"][START_ARTIFACT_INDEX:],
+                       start=START_ARTIFACT_INDEX, total=total_artifacts)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
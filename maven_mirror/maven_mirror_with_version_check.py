@@ -1,167 +1,335 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import queue
+import sqlite3
+import threading
 import time
-from bs4 import BeautifulSoup
+import xml.etree.ElementTree as ET
+
+# Адрес репозитория, каталог зеркала и набор скачиваемых файлов версии
+# (FILE_DISCOVERY, CLASSIFIERS, EXTENSIONS) настраиваются в maven_mirror.py
+from maven_mirror import BASE_URL, DOWNLOAD_DIR, download_version_files
+from maven_version import version_key, is_prerelease
 
-BASE_URL = "https://repo1.maven.org/maven2/"
 DEPENDENCIES_FILE = "dependencies.json"
 UPDATED_DEPENDENCIES_FILE = "updated_dependencies.json"
-DOWNLOAD_DIR = "L:/maven_mirror"  # Используем одинарный прямой слеш
-MAX_RETRIES = 3
-RETRY_DELAY = 5
 CHECK_NEW_VERSIONS = True  # Установите False, чтобы использовать версии из файла без проверки
 
 # Индекс артефакта, с которого начинать скачивание (начиная с 0)
 START_ARTIFACT_INDEX = 0
 
-def sanitize_filename(filename):
-    """Заменяет недопустимые символы в именах файлов на допустимые."""
-    invalid_chars = ':*?"<>|'
-    for char in invalid_chars:
-        filename = filename.replace(char, '_')
-    return filename
+# Манифест синхронизации (SQLite): для каждого артефакта ETag, Last-Modified, lastUpdated
+# и размер его maven-metadata.xml (сам файл лежит в зеркале), время проверки
+# и версия, которая полностью скачана. Артефакты, у которых метаданные не изменились,
+# а нужная версия уже скачана, не трогаются
+SYNC_MANIFEST_FILE = "sync_manifest.sqlite"
 
-def sanitize_path(path):
-    """Заменяет недопустимые символы в пути."""
-    return sanitize_filename(path).replace('"', '')
+# Итоги запуска: сколько артефактов изменилось, скачано, пропущено
+SYNC_SUMMARY_FILE = "sync_summary.json"
 
-def file_exists(url):
-    """Проверяет, существует ли файл по указанному URL."""
-    try:
-        response = requests.head(url)
-        return response.status_code == 200
-    except requests.exceptions.RequestException:
-        return False
+# Сколько секунд доверять кэшу maven-metadata.xml без запроса к серверу
+METADATA_CACHE_TTL = 24 * 3600
 
-def get_file_size(url):
-    """Возвращает размер файла на сервере."""
-    try:
-        response = requests.head(url)
-        if response.status_code == 200:
-            return int(response.headers.get("Content-Length", 0))
-        return 0
-    except requests.exceptions.RequestException:
-        return 0
+# Не переходить на alpha/beta/milestone/rc/snapshot версии
+SKIP_PRERELEASES = True
 
-def get_latest_version(group_id, artifact_id):
-    """Возвращает последнюю версию артефакта из Maven Central."""
-    url = f"{BASE_URL}{group_id.replace('.', '/')}/{artifact_id}/"
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, "html.parser")
-            versions = [a.text.strip("/") for a in soup.find_all("a") if a.text.strip("/").replace(".", "").isdigit()]
-            if versions:
-                return sorted(versions, reverse=True)[0]  # Последняя версия
-        return None
-    except requests.exceptions.RequestException:
+# Максимум одновременных соединений к одному хосту
+MAX_CONNECTIONS_PER_HOST = 8
+
+# Конвейер: RESOLVER_WORKERS потоков проверяют версии и передают артефакты через
+# очередь (не длиннее PIPELINE_QUEUE_SIZE) DOWNLOAD_WORKERS потокам скачивания
+RESOLVER_WORKERS = 8
+DOWNLOAD_WORKERS = 4
+PIPELINE_QUEUE_SIZE = 100
+
+# Журналы результатов проверки версий (по строке на артефакт). Пишутся по мере проверки,
+# поэтому после прерывания уже проверенные артефакты не проверяются заново.
+# После полного прохода из них собираются UPDATED_DEPENDENCIES_FILE и CHANGED_VERSIONS_FILE
+UPDATED_DEPENDENCIES_JOURNAL = "updated_dependencies.ndjson"
+CHANGED_VERSIONS_JOURNAL = "changed_versions.ndjson"
+CHANGED_VERSIONS_FILE = "changed_versions.json"
+
+# Флаг остановки для рабочих потоков (Ctrl+C)
+stop_event = threading.Event()
+
+def create_session():
+    """Создает общую HTTP-сессию с пулом keep-alive соединений."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONNECTIONS_PER_HOST, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Общая сессия для всех запросов
+session = create_session()
+
+class SyncManifest:
+    """Манифест синхронизации зеркала: по записи на groupId:artifactId. Потокобезопасен."""
+
+    COLUMNS = ("etag", "last_modified", "last_updated", "size", "checked_at", "synced_version")
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                last_updated TEXT,
+                size INTEGER,
+                checked_at REAL,
+                synced_version TEXT
+            )
+        """)
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM artifacts WHERE key = ?", (key,)
+            ).fetchone()
+        return dict(zip(self.COLUMNS, row)) if row else None
+
+    def update(self, key, **values):
+        """Обновляет поля записи (создает ее при необходимости)."""
+        columns = ", ".join(values)
+        placeholders = ", ".join("?" for _ in values)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in values)
+        with self.lock:
+            self.conn.execute(
+                f"INSERT INTO artifacts (key, {columns}) VALUES (?, {placeholders}) "
+                f"ON CONFLICT(key) DO UPDATE SET {updates}",
+                (key, *values.values()),
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# Манифест и счетчики итогов создаются в main()
+sync_manifest = None
+sync_stats = {}
+sync_stats_lock = threading.Lock()
+
+def count(name, item=None):
+    """Увеличивает счетчик итогов запуска (и запоминает артефакт, если он передан)."""
+    with sync_stats_lock:
+        sync_stats[name] = sync_stats.get(name, 0) + 1
+        if item is not None:
+            sync_stats.setdefault(f"{name}_list", []).append(item)
+
+def get_sync_manifest():
+    global sync_manifest
+    if sync_manifest is None:
+        sync_manifest = SyncManifest(SYNC_MANIFEST_FILE)
+    return sync_manifest
+
+def metadata_path_for(group_id, artifact_id):
+    """Путь к maven-metadata.xml артефакта в зеркале."""
+    return os.path.join(DOWNLOAD_DIR, "maven2", group_id.replace('.', os.sep), artifact_id, "maven-metadata.xml")
+
+def fetch_metadata(group_id, artifact_id):
+    """Возвращает текст maven-metadata.xml (или None, если его нет на сервере).
+
+    Если проверка была не раньше METADATA_CACHE_TTL секунд назад, файл берется
+    из зеркала без запросов; иначе делается условный GET с If-None-Match /
+    If-Modified-Since по данным манифеста, и ответ 304 только обновляет время проверки.
+    """
+    key = f"{group_id}:{artifact_id}"
+    manifest = get_sync_manifest()
+    metadata_path = metadata_path_for(group_id, artifact_id)
+    state = manifest.get(key) if os.path.exists(metadata_path) else None
+
+    if state and state["checked_at"] and time.time() - state["checked_at"] < METADATA_CACHE_TTL:
+        count("metadata_fresh")
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    headers = {}
+    if state and state["etag"]:
+        headers["If-None-Match"] = state["etag"]
+    if state and state["last_modified"]:
+        headers["If-Modified-Since"] = state["last_modified"]
+
+    url = f"{BASE_URL}{group_id.replace('.', '/')}/{artifact_id}/maven-metadata.xml"
+    response = session.get(url, headers=headers)
+    if response.status_code == 404:
+        count("metadata_not_found", key)
         return None
+    if response.status_code == 304:
+        count("metadata_unchanged")
+        manifest.update(key, checked_at=time.time())
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            return f.read()
 
-def download_file(url, path):
-    """Скачивает файл по URL и сохраняет его в указанный путь с поддержкой продолжения."""
-    # Сокращаем путь перед созданием директорий
-    sanitized_path = sanitize_path(path)
-    os.makedirs(os.path.dirname(sanitized_path), exist_ok=True)
-    
-    # Проверяем, существует ли файл и его размер
-    if os.path.exists(sanitized_path):
-        downloaded_size = os.path.getsize(sanitized_path)
-        file_size = get_file_size(url)
-        if downloaded_size == file_size:
-            print(f"Файл уже скачан: {url}")
-            return  # Файл уже полностью скачан
+    response.raise_for_status()
+    text = response.text
+    last_updated = parse_metadata(text)["last_updated"]
+    if state is None:
+        count("metadata_new", key)
+    elif state["last_updated"] != last_updated:
+        count("metadata_changed", key)
     else:
-        downloaded_size = 0
+        count("metadata_unchanged")  # Сервер отдал тот же файл (например, сменился ETag)
+    os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
+    with open(metadata_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(metadata_path + ".tmp", metadata_path)
+    manifest.update(
+        key,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        last_updated=last_updated,
+        size=len(response.content),
+        checked_at=time.time(),
+    )
+    return text
 
-    # Устанавливаем заголовок Range для продолжения загрузки
-    headers = {"Range": f"bytes={downloaded_size}-"} if downloaded_size > 0 else {}
+def parse_metadata(text):
+    """Разбирает maven-metadata.xml: latest, release, lastUpdated и список версий."""
+    versioning = ET.fromstring(text).find("versioning")
+    if versioning is None:
+        return {"latest": None, "release": None, "last_updated": None, "versions": []}
+    return {
+        "latest": versioning.findtext("latest"),
+        "release": versioning.findtext("release"),
+        "last_updated": versioning.findtext("lastUpdated"),
+        "versions": [v.text.strip() for v in versioning.findall("versions/version") if v.text],
+    }
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            with requests.get(url, headers=headers, stream=True) as r:
-                r.raise_for_status()
-                # Проверяем, поддерживает ли сервер продолжение загрузки
-                if r.status_code == 206:
-                    print(f"Продолжение загрузки: {url} (с {downloaded_size} байт)")
-                    mode = "ab"
-                else:
-                    print(f"Начало загрузки: {url}")
-                    mode = "wb"  # Перезаписываем файл
-
-                with open(sanitized_path, mode) as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                return  # Успешное скачивание
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка при скачивании (попытка {attempt + 1} из {MAX_RETRIES}): {url}")
-            print(f"Ошибка: {e}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-            else:
-                raise  # Повторные попытки исчерпаны
-
-def artifact_exists_locally(group_id, artifact_id, version):
-    """Проверяет, существует ли артефакт локально."""
-    sanitized_version = sanitize_path(version)
-    base_path = f"{group_id.replace('.', '/')}/{artifact_id}/{sanitized_version}/"
-    
-    # Проверяем наличие основного JAR файла
-    jar_path = os.path.join(DOWNLOAD_DIR, "maven2", base_path.replace('/', os.sep), 
-                           f"{artifact_id}-{sanitized_version}.jar")
-    
-    # Проверяем наличие POM файла
-    pom_path = os.path.join(DOWNLOAD_DIR, "maven2", base_path.replace('/', os.sep), 
-                           f"{artifact_id}-{sanitized_version}.pom")
-    
-    # Если оба файла существуют, считаем, что артефакт уже скачан
-    return os.path.exists(jar_path) and os.path.exists(pom_path)
+def get_latest_version(group_id, artifact_id):
+    """Возвращает последнюю версию артефакта по maven-metadata.xml.
+
+    Версии сравниваются по правилам Maven (1.10 > 1.9, 1.0-rc1 < 1.0);
+    если список версий пуст, берется <release> или <latest>.
+    Возвращает None, если метаданных нет на сервере. Ошибки сети и разбора
+    не перехватываются: версия не считается проверенной и проверяется при следующем запуске.
+    """
+    text = fetch_metadata(group_id, artifact_id)
+    if text is None:
+        return None
+    metadata = parse_metadata(text)
+    versions = metadata["versions"]
+    if SKIP_PRERELEASES:
+        versions = [v for v in versions if not is_prerelease(v)]
+    if versions:
+        return max(versions, key=version_key)
+    return metadata["release"] or metadata["latest"]
 
 def download_artifact(group_id, artifact_id, version):
-    """Скачивает артефакт (JAR, POM, источники, документацию и метаданные)."""
-    # Санитизируем версию (удаляем кавычки)
-    sanitized_version = sanitize_path(version)
-    
-    # Проверяем, существует ли артефакт локально
-    if artifact_exists_locally(group_id, artifact_id, version):
-        print(f"Артефакт {group_id}:{artifact_id}:{version} уже существует локально. Пропускаем скачивание.")
+    """Скачивает артефакт (JAR, POM, источники, документацию и метаданные).
+
+    Версия, уже полностью скачанная по данным манифеста, пропускается без запросов.
+    """
+    key = f"{group_id}:{artifact_id}"
+    manifest = get_sync_manifest()
+    state = manifest.get(key)
+    if state and state["synced_version"] == version:
+        count("skipped")
         return
-    
-    base_path = f"{group_id.replace('.', '/')}/{artifact_id}/{sanitized_version}/"
-    files = [
-        f"{artifact_id}-{sanitized_version}.jar",
-        f"{artifact_id}-{sanitized_version}.pom",
-        f"{artifact_id}-{sanitized_version}-sources.jar",
-        f"{artifact_id}-{sanitized_version}-javadoc.jar",
-        f"{artifact_id}-{sanitized_version}.module",  # Модульные метаданные (если есть)
-    ]
-    
-    # Скачиваем основные файлы
-    for file in files:
-        url = f"{BASE_URL}{base_path}{file}"
-        # Очищаем имя файла от недопустимых символов
-        sanitized_file = sanitize_filename(file)
-        path = os.path.join(DOWNLOAD_DIR, "maven2", base_path.replace('/', os.sep), sanitized_file)
-        
-        # Проверяем, существует ли файл на сервере
-        if file_exists(url):
-            try:
-                download_file(url, path)
-            except requests.exceptions.RequestException:
-                print(f"Не удалось скачать: {url}")
-        else:
-            print(f"Файл не найден: {url}")
 
-    # Скачиваем maven-metadata.xml
-    metadata_url = f"{BASE_URL}{group_id.replace('.', '/')}/{artifact_id}/maven-metadata.xml"
-    metadata_path = os.path.join(DOWNLOAD_DIR, "maven2", group_id.replace('.', os.sep), artifact_id, "maven-metadata.xml")
-    if file_exists(metadata_url):
+    # Файлы версии - по списку каталога на сервере, как в maven_mirror.py. Уже скачанные
+    # файлы того же размера не запрашиваются, недостающие классификаторы докачиваются
+    ok = download_version_files(group_id, artifact_id, version)
+
+    # Скачиваем maven-metadata.xml (при CHECK_NEW_VERSIONS он уже получен при проверке версии)
+    if not CHECK_NEW_VERSIONS:
         try:
-            download_file(metadata_url, metadata_path)
-        except requests.exceptions.RequestException:
-            print(f"Не удалось скачать метаданные: {metadata_url}")
+            if fetch_metadata(group_id, artifact_id) is None:
+                print(f"Метаданные не найдены: {group_id}:{artifact_id}")
+        except (requests.exceptions.RequestException, OSError):
+            print(f"Не удалось скачать метаданные: {group_id}:{artifact_id}")
+            ok = False
+
+    if ok:
+        # Версия скачана полностью - в следующий раз артефакт не трогаем, пока не изменятся метаданные
+        manifest.update(key, synced_version=version)
+        count("downloaded", f"{key}:{version}")
     else:
-        print(f"Метаданные не найдены: {metadata_url}")
+        count("failed", f"{key}:{version}")
+
+def resolve_artifact(artifact):
+    """Определяет версию для скачивания.
+
+    Возвращает (запись для updated_dependencies, запись об изменении версии или None).
+    """
+    group_id = artifact["group_id"]
+    artifact_id = artifact["artifact_id"]
+    current_version = artifact["latest_version"]
+
+    # Проверяем новую версию, если флаг CHECK_NEW_VERSIONS установлен
+    version_to_download = current_version
+    change = None
+    if CHECK_NEW_VERSIONS:
+        print(f"Проверка новой версии для {group_id}:{artifact_id}")
+        latest_version = get_latest_version(group_id, artifact_id)
+        # Переходим только на более новую версию: текущая может быть пререлизом или новее
+        # последнего релиза из метаданных (SKIP_PRERELEASES), и ее нельзя менять на старую
+        if latest_version and version_key(latest_version) > version_key(current_version):
+            print(f"Найдена новая версия: {latest_version} (текущая: {current_version})")
+            version_to_download = latest_version
+            change = {
+                "group_id": group_id,
+                "artifact_id": artifact_id,
+                "old_version": current_version,
+                "new_version": latest_version
+            }
+        elif not latest_version:
+            print(f"Метаданные {group_id}:{artifact_id} не найдены, используем текущую версию: {current_version}")
+        elif latest_version != current_version:
+            print(f"Версия актуальна: {current_version} (последняя версия в метаданных: {latest_version})")
+        else:
+            print(f"Версия актуальна: {current_version}")
+
+    record = {
+        "group_id": group_id,
+        "artifact_id": artifact_id,
+        "latest_version": version_to_download
+    }
+    return record, change
+
+def artifact_key(artifact):
+    return f"{artifact['group_id']}:{artifact['artifact_id']}"
+
+def load_journal(path):
+    """Читает журнал NDJSON в словарь {groupId:artifactId: запись} (последняя запись побеждает)."""
+    records = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Недописанная строка после аварийного завершения
+                records[artifact_key(record)] = record
+    except FileNotFoundError:
+        pass
+    return records
+
+def open_journal(path):
+    """Открывает журнал на дописывание и завершает недописанную последнюю строку."""
+    journal = open(path, "a", encoding="utf-8")
+    if journal.tell() > 0:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                journal.write("\n")
+    return journal
+
+def write_sync_summary():
+    """Печатает и сохраняет итоги запуска (что изменилось по сравнению с прошлой синхронизацией)."""
+    with sync_stats_lock:
+        summary = {"finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"), **sync_stats}
+    print("Итоги синхронизации:")
+    for name in ("metadata_fresh", "metadata_unchanged", "metadata_changed", "metadata_new",
+                 "metadata_not_found", "skipped", "downloaded", "failed"):
+        print(f"  {name}: {summary.get(name, 0)}")
+    with open(SYNC_SUMMARY_FILE, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
 
 def main():
     # Загружаем зависимости из файла dependencies.json
@@ -171,60 +339,134 @@ def main():
     # Проверяем количество артефактов
     total_artifacts = len(dependencies["artifacts"])
     print(f"Общее количество артефактов: {total_artifacts}")
-    
-    # Список для хранения обновленных артефактов и изменившихся версий
-    updated_artifacts = []
-    changed_versions = []
-
-    # Скачиваем артефакты, начиная с указанного индекса
-    for index, artifact in enumerate(dependencies["artifacts"]):
-        if index < START_ARTIFACT_INDEX:
-            continue  # Пропускаем артефакты до указанного индекса
-            
-        group_id = artifact["group_id"]
-        artifact_id = artifact["artifact_id"]
-        current_version = artifact["latest_version"]
-        
-        # Проверяем новую версию, если флаг CHECK_NEW_VERSIONS установлен
-        version_to_download = current_version
-        if CHECK_NEW_VERSIONS:
-            print(f"Проверка новой версии для {group_id}:{artifact_id}")
-            latest_version = get_latest_version(group_id, artifact_id)
-            if latest_version and latest_version != current_version:
-                print(f"Найдена новая версия: {latest_version} (текущая: {current_version})")
-                version_to_download = latest_version
-                changed_versions.append({
-                    "group_id": group_id,
-                    "artifact_id": artifact_id,
-                    "old_version": current_version,
-                    "new_version": latest_version
-                })
-            elif not latest_version:
-                print(f"Не удалось получить новую версию для {group_id}:{artifact_id}, используем текущую: {current_version}")
+    artifacts = dependencies["artifacts"][START_ARTIFACT_INDEX:]
+
+    # Результаты прошлого прерванного запуска
+    resolved = load_journal(UPDATED_DEPENDENCIES_JOURNAL)
+    changed = load_journal(CHANGED_VERSIONS_JOURNAL)
+    if resolved:
+        print(f"Продолжение прерванного запуска: версии уже проверены для {len(resolved)} артефактов")
+
+    updated_journal = open_journal(UPDATED_DEPENDENCIES_JOURNAL)
+    changed_journal = open_journal(CHANGED_VERSIONS_JOURNAL)
+    journal_lock = threading.Lock()
+    journals_closed = False
+
+    resolve_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    download_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+    def resolver():
+        while True:
+            item = resolve_queue.get()
+            if item is None or stop_event.is_set():
+                return
+            index, artifact = item
+            try:
+                record, change = resolve_artifact(artifact)
+            except Exception as e:
+                # Не записываем в журнал: следующий запуск проверит версию заново
+                print(f"Ошибка проверки версии {artifact_key(artifact)}: {e}")
+                record = {key: artifact[key] for key in ("group_id", "artifact_id", "latest_version")}
+                with journal_lock:
+                    resolved[artifact_key(record)] = record
+                download_queue.put((index, record))
+                continue
+            # Результат проверки сохраняется сразу, до скачивания
+            with journal_lock:
+                if journals_closed:
+                    return  # Повторное прерывание: главный поток уже закрыл журналы
+                resolved[artifact_key(record)] = record
+                updated_journal.write(json.dumps(record) + "\n")
+                updated_journal.flush()
+                if change:
+                    changed[artifact_key(change)] = change
+                    changed_journal.write(json.dumps(change) + "\n")
+                    changed_journal.flush()
+            download_queue.put((index, record))
+
+    def downloader():
+        while True:
+            item = download_queue.get()
+            if item is None or stop_event.is_set():
+                return
+            index, record = item
+            group_id = record["group_id"]
+            artifact_id = record["artifact_id"]
+            version = record["latest_version"]
+            print(f"Скачивание артефакта {index + 1}/{total_artifacts}: {group_id}:{artifact_id}:{version}")
+            try:
+                download_artifact(group_id, artifact_id, version)
+            except Exception as e:
+                print(f"Ошибка при скачивании {group_id}:{artifact_id}:{version}: {e}")
+
+    def stop_workers():
+        """Дожидается выхода потоков после stop_event.
+
+        Очереди освобождаются, чтобы потоки, ждущие в get() или put(), проснулись и увидели остановку.
+        """
+        for thread in resolvers + downloaders:
+            while thread.is_alive():
+                for pipeline_queue in (resolve_queue, download_queue):
+                    try:
+                        while True:
+                            pipeline_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    try:
+                        pipeline_queue.put_nowait(None)
+                    except queue.Full:
+                        pass
+                thread.join(0.1)
+
+    resolvers = [threading.Thread(target=resolver, daemon=True) for _ in range(RESOLVER_WORKERS)]
+    downloaders = [threading.Thread(target=downloader, daemon=True) for _ in range(DOWNLOAD_WORKERS)]
+    for thread in resolvers + downloaders:
+        thread.start()
+
+    try:
+        for index, artifact in enumerate(artifacts, start=START_ARTIFACT_INDEX):
+            if artifact_key(artifact) in resolved:
+                # Версия уже проверена в прошлом запуске - сразу на скачивание
+                download_queue.put((index, resolved[artifact_key(artifact)]))
             else:
-                print(f"Версия актуальна: {current_version}")
-        
-        # Добавляем артефакт с актуальной версией в список обновленных
-        updated_artifacts.append({
-            "group_id": group_id,
-            "artifact_id": artifact_id,
-            "latest_version": version_to_download
-        })
-        
-        # Скачиваем артефакт
-        print(f"Скачивание артефакта {index + 1}/{total_artifacts}: {group_id}:{artifact_id}:{version_to_download}")
-        download_artifact(group_id, artifact_id, version_to_download)
-    
-    # Сохраняем обновленные зависимости
+                resolve_queue.put((index, artifact))
+        for _ in resolvers:
+            resolve_queue.put(None)
+        for thread in resolvers:
+            thread.join()
+        for _ in downloaders:
+            download_queue.put(None)
+        for thread in downloaders:
+            thread.join()
+    except KeyboardInterrupt:
+        print("Прерывание: дожидаемся завершения начатых проверок и загрузок...")
+        stop_event.set()
+        stop_workers()
+        print("Результаты проверки версий сохранены в журналах, следующий запуск продолжит с них")
+        return
+    finally:
+        with journal_lock:
+            journals_closed = True
+            updated_journal.close()
+            changed_journal.close()
+        write_sync_summary()
+
+    # Сохраняем обновленные зависимости (в порядке исходного списка)
+    updated_artifacts = [resolved[artifact_key(artifact)] for artifact in artifacts]
     with open(UPDATED_DEPENDENCIES_FILE, "w", encoding="utf-8") as f:
         json.dump({"artifacts": updated_artifacts}, f, indent=2)
     print(f"Обновлённые зависимости сохранены в {UPDATED_DEPENDENCIES_FILE}")
-    
+
     # Сохраняем список изменённых версий, если есть изменения
+    changed_versions = [changed[artifact_key(artifact)] for artifact in artifacts if artifact_key(artifact) in changed]
     if changed_versions:
-        with open("changed_versions.json", "w", encoding="utf-8") as f:
+        with open(CHANGED_VERSIONS_FILE, "w", encoding="utf-8") as f:
             json.dump({"changed_artifacts": changed_versions}, f, indent=2)
-        print(f"Список изменённых версий сохранён в changed_versions.json")
+        print(f"Список изменённых версий сохранён в {CHANGED_VERSIONS_FILE}")
+
+    # Проход завершен - журналы больше не нужны
+    os.remove(UPDATED_DEPENDENCIES_JOURNAL)
+    os.remove(CHANGED_VERSIONS_JOURNAL)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,137 @@
+from functools import cmp_to_key
+
+# Сравнение версий Maven по правилам ComparableVersion (maven-artifact):
+# версия делится на числа и строки по ".", "-" и переходам цифра/буква,
+# числа сравниваются как числа, а квалификаторы - в порядке
+# alpha < beta < milestone < rc < snapshot < (релиз) < sp < прочие строки.
+# Поэтому 1.10 > 1.9, 1.0-rc1 < 1.0, 1.0 == 1.0.0 == 1.0-ga.
+
+QUALIFIERS = ["alpha", "beta", "milestone", "rc", "snapshot", "", "sp"]
+
+QUALIFIER_ALIASES = {"ga": "", "final": "", "release": "", "cr": "rc"}
+
+# Однобуквенные сокращения, если сразу за буквой идет цифра (1.0a1 = 1.0-alpha-1)
+SHORT_QUALIFIERS = {"a": "alpha", "b": "beta", "m": "milestone"}
+
+RELEASE_QUALIFIER_INDEX = QUALIFIERS.index("")
+
+class ListItem(list):
+    """Подсписок версии (часть после "-" или перехода цифра/буква)."""
+
+def qualifier_key(value):
+    """Ключ сортировки строкового элемента: известные квалификаторы по порядку, остальные после них."""
+    if value in QUALIFIERS:
+        return (QUALIFIERS.index(value), "")
+    return (len(QUALIFIERS), value)
+
+def parse_item(is_digit, text, followed_by_digit=False):
+    if is_digit:
+        return int(text)
+    if followed_by_digit and len(text) == 1:
+        text = SHORT_QUALIFIERS.get(text, text)
+    return QUALIFIER_ALIASES.get(text, text)
+
+def is_null(item):
+    """Элемент, равный отсутствующему: 0, пустой квалификатор (ga/final/release) или пустой подсписок."""
+    if isinstance(item, ListItem):
+        return not item
+    return item == 0 or item == ""
+
+def normalize(items):
+    """Убирает незначащие элементы с конца списка (1.0.0 -> 1, 1.0-alpha -> 1-alpha)."""
+    for i in range(len(items) - 1, -1, -1):
+        if is_null(items[i]):
+            del items[i]
+        elif not isinstance(items[i], ListItem):
+            break
+
+def parse_version(version):
+    """Разбирает строку версии в дерево элементов (int, str, ListItem)."""
+    version = version.lower()
+    root = current = ListItem()
+    stack = [root]
+    is_digit = False
+    start = 0
+    for i, char in enumerate(version):
+        if char == ".":
+            current.append(0 if i == start else parse_item(is_digit, version[start:i]))
+            start = i + 1
+        elif char == "-":
+            current.append(0 if i == start else parse_item(is_digit, version[start:i]))
+            start = i + 1
+            current.append(ListItem())
+            current = current[-1]
+            stack.append(current)
+        elif char.isdigit():
+            if not is_digit and i > start:
+                # Переход буква -> цифра работает как "-": 1.0alpha1 = 1.0-alpha-1
+                current.append(parse_item(False, version[start:i], followed_by_digit=True))
+                start = i
+                current.append(ListItem())
+                current = current[-1]
+                stack.append(current)
+            is_digit = True
+        else:
+            if is_digit and i > start:
+                current.append(parse_item(True, version[start:i]))
+                start = i
+                current.append(ListItem())
+                current = current[-1]
+                stack.append(current)
+            is_digit = False
+    if len(version) > start:
+        current.append(parse_item(is_digit, version[start:]))
+    while stack:
+        normalize(stack.pop())
+    return root
+
+def compare_items(left, right):
+    """Сравнивает два элемента версии (None - отсутствующий элемент)."""
+    if left is None and right is None:
+        return 0
+    if left is None:
+        return -compare_items(right, None)
+    if isinstance(left, int):
+        if right is None:
+            return 0 if left == 0 else 1
+        if isinstance(right, int):
+            return (left > right) - (left < right)
+        return 1  # Число больше строки и подсписка
+    if isinstance(left, str):
+        if right is None:
+            right = ""
+        elif isinstance(right, int) or isinstance(right, ListItem):
+            return -1  # Строка меньше числа и подсписка
+        left_key, right_key = qualifier_key(left), qualifier_key(right)
+        return (left_key > right_key) - (left_key < right_key)
+    # left - подсписок
+    if right is None:
+        return compare_items(left[0], None) if left else 0
+    if isinstance(right, int):
+        return -1
+    if isinstance(right, str):
+        return 1
+    for i in range(max(len(left), len(right))):
+        result = compare_items(left[i] if i < len(left) else None, right[i] if i < len(right) else None)
+        if result:
+            return result
+    return 0
+
+def compare_versions(left, right):
+    """Сравнивает две строки версий Maven: -1, 0 или 1."""
+    return compare_items(parse_version(left), parse_version(right))
+
+# Ключ для sorted()/max(): sorted(versions, key=version_key)
+version_key = cmp_to_key(compare_versions)
+
+def is_prerelease(version):
+    """Проверяет, есть ли в версии квалификатор ниже релиза (alpha, beta, milestone, rc, snapshot)."""
+    def walk(items):
+        for item in items:
+            if isinstance(item, ListItem):
+                if walk(item):
+                    return True
+            elif isinstance(item, str) and qualifier_key(item)[0] < RELEASE_QUALIFIER_INDEX:
+                return True
+        return False
+    return walk(parse_version(version))
@@ -0,0 +1,433 @@
+import json
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+
+import maven_mirror as mirror
+from maven_version import compare_versions, version_key
+
+# Скрипт строит транзитивное замыкание зависимостей (compile/runtime) для наших сборок
+# и скачивает в зеркало только нужные версии, а не последнюю версию каждого артефакта.
+# POM-файлы читаются из зеркала (DOWNLOAD_DIR из maven_mirror.py) и скачиваются туда же,
+# поэтому повторное разрешение не делает сетевых запросов, а родительские POM и BOM
+# оказываются в зеркале и доступны Maven при сборке.
+
+# Стартовые артефакты в формате groupId:artifactId:version
+SEED_GAVS = []  # Например, ["org.springframework.boot:spring-boot-starter-web:3.2.0"]
+
+# pom.xml наших проектов: их зависимости (включая optional) и dependencyManagement
+SEED_POMS = []  # Например, ["d:/projects/app/pom.xml"]
+
+# Какие scope входят в замыкание (test и provided не транзитивны и при сборке не нужны)
+INCLUDE_SCOPES = ["compile", "runtime"]
+
+# Файл с результатом (формат dependencies.json, поле latest_version - нужная версия)
+OUTPUT_FILE = "closure_dependencies.json"
+
+# Сразу скачать замыкание через maven_mirror.download_artifacts()
+DOWNLOAD_CLOSURE = True
+
+# Сколько POM скачивать одновременно
+MAX_WORKERS = 8
+
+# Сколько раз подряд подставлять свойства ${...} (свойства могут ссылаться друг на друга)
+MAX_INTERPOLATION_DEPTH = 10
+
+PROPERTY_PATTERN = re.compile(r"\$\{([^}]+)\}")
+
+# Блокировки файлов зеркала: один файл скачивает и разбирает один поток
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+def strip_namespaces(root):
+    """Убирает пространство имен POM из тегов, чтобы искать элементы по простым именам."""
+    for element in root.iter():
+        if isinstance(element.tag, str) and "}" in element.tag:
+            element.tag = element.tag.split("}", 1)[1]
+    return root
+
+def text_of(element, path, default=None):
+    value = element.findtext(path) if element is not None else None
+    return value.strip() if value and value.strip() else default
+
+def pom_path(group_id, artifact_id, version):
+    """Путь к POM в зеркале (так же, как его сохраняет maven_mirror.py)."""
+    base_path = f"{group_id.replace('.', '/')}/{artifact_id}/{mirror.sanitize_path(version)}/"
+    file = mirror.sanitize_filename(f"{artifact_id}-{mirror.sanitize_path(version)}.pom")
+    return os.path.join(mirror.DOWNLOAD_DIR, "maven2", base_path.replace('/', os.sep), file), base_path + file
+
+def load_xml_file(url, path):
+    """Возвращает разобранный XML из зеркала, при отсутствии скачивает его (None, если файла нет).
+
+    Файл записывается через временный файл, поэтому другой поток или следующий запуск
+    не прочитает его недописанным. Файл, который не разбирается (остался от прерванного
+    запуска старой версии), удаляется и скачивается заново.
+    """
+    path = mirror.sanitize_path(path)
+    with _path_locks_lock:
+        lock = _path_locks.setdefault(path, threading.Lock())
+    with lock:
+        for attempt in range(2):
+            if not os.path.exists(path):
+                if mirror.download_file(url, path, mutable=True) == "not_found":
+                    return None
+            try:
+                return strip_namespaces(ET.parse(path).getroot())
+            except ET.ParseError:
+                if attempt:
+                    raise
+                print(f"Файл в зеркале поврежден, скачиваем заново: {url}")
+                os.remove(path)
+
+def load_pom_file(group_id, artifact_id, version):
+    """Возвращает разобранный POM из зеркала, при отсутствии скачивает его (None, если POM нет)."""
+    path, url_path = pom_path(group_id, artifact_id, version)
+    return load_xml_file(mirror.BASE_URL + url_path, path)
+
+def parse_dependency(element):
+    """Разбирает <dependency> (значения пока без подстановки свойств)."""
+    return {
+        "group_id": text_of(element, "groupId"),
+        "artifact_id": text_of(element, "artifactId"),
+        "version": text_of(element, "version"),
+        "type": text_of(element, "type", "jar"),
+        "classifier": text_of(element, "classifier"),
+        "scope": text_of(element, "scope"),
+        "optional": text_of(element, "optional", "false"),
+        "exclusions": [
+            (text_of(exclusion, "groupId", "*"), text_of(exclusion, "artifactId", "*"))
+            for exclusion in element.findall("exclusions/exclusion")
+        ],
+    }
+
+def dependency_key(dependency):
+    return (dependency["group_id"], dependency["artifact_id"], dependency["type"], dependency["classifier"])
+
+def parse_version_range(spec):
+    """Разбирает диапазон версий Maven ("[1.0,2.0)", "[1.5,)", "(,1.0],[1.2,)").
+
+    Возвращает список интервалов (нижняя, включительно, верхняя, включительно)
+    или None, если это обычная (рекомендуемая) версия.
+    """
+    spec = spec.strip()
+    if not spec.startswith(("[", "(")):
+        return None
+    ranges = []
+    for match in re.finditer(r"([\[(])([^\])]*)([\])])", spec):
+        low_bracket, body, high_bracket = match.groups()
+        if "," in body:
+            low, high = (part.strip() or None for part in body.split(",", 1))
+        else:
+            low = high = body.strip()  # [1.0] - точная версия
+        ranges.append((low, low_bracket == "[", high, high_bracket == "]"))
+    return ranges
+
+def version_in_ranges(version, ranges):
+    for low, low_inclusive, high, high_inclusive in ranges:
+        if low is not None:
+            result = compare_versions(version, low)
+            if result < 0 or (result == 0 and not low_inclusive):
+                continue
+        if high is not None:
+            result = compare_versions(version, high)
+            if result > 0 or (result == 0 and not high_inclusive):
+                continue
+        return True
+    return False
+
+class PomResolver:
+    """Строит эффективные модели POM (наследование, свойства, dependencyManagement, BOM)
+    и транзитивное замыкание зависимостей по правилу "ближайшая версия побеждает"."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # gav -> Future с моделью: POM загружает первый запросивший поток, остальные ждут
+        self.models = {}
+        # POM, которые строит текущий поток (для защиты от циклического наследования)
+        self.building = threading.local()
+        # POM, которые нужны только как родители или BOM (без своих файлов-артефактов)
+        self.pom_only = set()
+
+    def raw_model(self, root):
+        """Модель одного POM без наследования."""
+        parent = root.find("parent")
+        parent_gav = None
+        if parent is not None:
+            parent_gav = (text_of(parent, "groupId"), text_of(parent, "artifactId"), text_of(parent, "version"))
+        properties = {}
+        properties_element = root.find("properties")
+        if properties_element is not None:
+            for element in properties_element:
+                if isinstance(element.tag, str):
+                    properties[element.tag] = (element.text or "").strip()
+        relocation = root.find("distributionManagement/relocation")
+        return {
+            "group_id": text_of(root, "groupId") or (parent_gav[0] if parent_gav else None),
+            "artifact_id": text_of(root, "artifactId"),
+            "version": text_of(root, "version") or (parent_gav[2] if parent_gav else None),
+            "parent": parent_gav,
+            "properties": properties,
+            "managed": [parse_dependency(d) for d in root.findall("dependencyManagement/dependencies/dependency")],
+            "dependencies": [parse_dependency(d) for d in root.findall("dependencies/dependency")],
+            "relocation": None if relocation is None else {
+                "group_id": text_of(relocation, "groupId"),
+                "artifact_id": text_of(relocation, "artifactId"),
+                "version": text_of(relocation, "version"),
+            },
+        }
+
+    def effective_model(self, group_id, artifact_id, version):
+        """Эффективная модель POM из репозитория (с кэшем в памяти).
+
+        Один и тот же POM (например, общий родитель) строится одним потоком,
+        остальные потоки ждут его модель.
+        """
+        gav = (group_id, artifact_id, version)
+        building = self.building.__dict__.setdefault("gavs", set())
+        if gav in building:
+            print(f"Циклическое наследование POM: {':'.join(gav)}")
+            return None
+        with self.lock:
+            future = self.models.get(gav)
+            if future is None:
+                future = self.models[gav] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return future.result()
+
+        model = None
+        building.add(gav)
+        try:
+            root = load_pom_file(*gav)
+            if root is not None:
+                model = self.build_model(root)
+        except (requests.exceptions.RequestException, OSError, ET.ParseError) as e:
+            print(f"Не удалось прочитать POM {':'.join(gav)}: {e}")
+            with self.lock:
+                del self.models[gav]  # Не кэшируем: при следующем обращении попробуем снова
+        finally:
+            building.discard(gav)
+            future.set_result(model)
+        return model
+
+    def effective_model_from_file(self, path):
+        """Эффективная модель pom.xml проекта."""
+        return self.build_model(strip_namespaces(ET.parse(path).getroot()), project_dir=os.path.dirname(path))
+
+    def load_parent(self, parent_gav, project_dir):
+        """Родительский POM: из relativePath проекта (если он есть и совпадает), иначе из репозитория."""
+        if project_dir is not None:
+            parent_file = os.path.join(project_dir, "..", "pom.xml")
+            if os.path.exists(parent_file):
+                root = strip_namespaces(ET.parse(parent_file).getroot())
+                raw = self.raw_model(root)
+                if (raw["group_id"], raw["artifact_id"]) == parent_gav[:2]:
+                    return self.build_model(root, project_dir=os.path.dirname(parent_file))
+        with self.lock:
+            self.pom_only.add(parent_gav)
+        return self.effective_model(*parent_gav)
+
+    def build_model(self, root, project_dir=None):
+        raw = self.raw_model(root)
+
+        # Наследование: свойства, dependencyManagement и зависимости родителя (потомок переопределяет)
+        properties, managed, dependencies = {}, {}, {}
+        if raw["parent"]:
+            parent = self.load_parent(raw["parent"], project_dir)
+            if parent is None:
+                print(f"Родительский POM не найден: {':'.join(raw['parent'])}")
+            else:
+                properties.update(parent["properties"])
+                managed.update(parent["raw_managed"])
+                dependencies.update(parent["raw_dependencies"])
+        properties.update(raw["properties"])
+        for dependency in raw["managed"]:
+            managed[dependency_key(dependency)] = dependency
+        for dependency in raw["dependencies"]:
+            dependencies[dependency_key(dependency)] = dependency
+
+        properties.update({
+            "project.groupId": raw["group_id"], "pom.groupId": raw["group_id"], "groupId": raw["group_id"],
+            "project.artifactId": raw["artifact_id"], "pom.artifactId": raw["artifact_id"],
+            "project.version": raw["version"], "pom.version": raw["version"], "version": raw["version"],
+        })
+        if raw["parent"]:
+            properties["project.parent.groupId"] = raw["parent"][0]
+            properties["project.parent.version"] = raw["parent"][2]
+
+        def interpolate(value):
+            for _ in range(MAX_INTERPOLATION_DEPTH):
+                if not value or "${" not in value:
+                    break
+                value = PROPERTY_PATTERN.sub(lambda m: properties.get(m.group(1)) or m.group(0), value)
+            return value
+
+        def resolve(dependency):
+            resolved = {key: interpolate(value) if isinstance(value, str) else value for key, value in dependency.items()}
+            resolved["exclusions"] = [(interpolate(g), interpolate(a)) for g, a in dependency["exclusions"]]
+            return resolved
+
+        # Импорт BOM: dependencyManagement из POM со scope import добавляется к своему
+        effective_managed = {}
+        imports = []
+        for key, dependency in managed.items():
+            dependency = resolve(dependency)
+            if dependency["scope"] == "import" and dependency["type"] == "pom":
+                imports.append(dependency)
+            else:
+                effective_managed[dependency_key(dependency)] = dependency
+        for bom in imports:
+            bom_gav = (bom["group_id"], bom["artifact_id"], bom["version"])
+            with self.lock:
+                self.pom_only.add(bom_gav)
+            bom_model = self.effective_model(*bom_gav)
+            if bom_model is None:
+                print(f"BOM не найден: {':'.join(map(str, bom_gav))}")
+                continue
+            for key, dependency in bom_model["managed"].items():
+                effective_managed.setdefault(key, dependency)  # Явно указанные и ранее импортированные важнее
+
+        # Версия и scope зависимостей без них берутся из dependencyManagement
+        effective_dependencies = []
+        for dependency in dependencies.values():
+            dependency = resolve(dependency)
+            managed_dependency = effective_managed.get(dependency_key(dependency))
+            if managed_dependency:
+                dependency["version"] = dependency["version"] or managed_dependency["version"]
+                dependency["scope"] = dependency["scope"] or managed_dependency["scope"]
+                if not dependency["exclusions"]:
+                    dependency["exclusions"] = managed_dependency["exclusions"]
+            effective_dependencies.append(dependency)
+
+        relocation = raw["relocation"]
+        if relocation:
+            relocation = {
+                "group_id": interpolate(relocation["group_id"]) or raw["group_id"],
+                "artifact_id": interpolate(relocation["artifact_id"]) or raw["artifact_id"],
+                "version": interpolate(relocation["version"]) or raw["version"],
+            }
+        return {
+            "group_id": raw["group_id"],
+            "artifact_id": raw["artifact_id"],
+            "version": raw["version"],
+            "properties": properties,
+            "raw_managed": managed,
+            "raw_dependencies": dependencies,
+            "managed": effective_managed,
+            "dependencies": effective_dependencies,
+            "relocation": relocation,
+        }
+
+    def resolve_version(self, group_id, artifact_id, spec):
+        """Превращает диапазон версий в конкретную версию (наибольшую подходящую из maven-metadata.xml)."""
+        ranges = parse_version_range(spec)
+        if ranges is None:
+            return spec
+        metadata_path = os.path.join(mirror.DOWNLOAD_DIR, "maven2", group_id.replace('.', os.sep), artifact_id, "maven-metadata.xml")
+        metadata_url = f"{mirror.BASE_URL}{group_id.replace('.', '/')}/{artifact_id}/maven-metadata.xml"
+        try:
+            root = load_xml_file(metadata_url, metadata_path)
+            if root is None:
+                return None
+        except (requests.exceptions.RequestException, OSError, ET.ParseError) as e:
+            print(f"Не удалось прочитать maven-metadata.xml {group_id}:{artifact_id}: {e}")
+            return None
+        versions = [v.text.strip() for v in root.findall("versioning/versions/version") if v.text]
+        matching = [v for v in versions if version_in_ranges(v, ranges)]
+        return max(matching, key=version_key) if matching else None
+
+    def resolve(self, seed_gavs, seed_poms):
+        """Транзитивное замыкание: обход в ширину, для каждого groupId:artifactId
+        берется версия, найденная на наименьшей глубине (как в Maven).
+
+        Возвращает список (groupId, artifactId, version).
+        """
+        selected = {}
+        # Элемент уровня: (g, a, версия или диапазон, исключения, dependencyManagement корня, брать optional)
+        level = [(g, a, v, frozenset(), {}) for g, a, v in seed_gavs]
+        for path in seed_poms:
+            model = self.effective_model_from_file(path)
+            print(f"{path}: {model['group_id']}:{model['artifact_id']}:{model['version']}")
+            level.extend(self.children(model, frozenset(), model["managed"], include_optional=True))
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            while level:
+                candidates = []
+                for group_id, artifact_id, version, exclusions, root_managed in level:
+                    if (group_id, artifact_id) in selected:
+                        continue  # Ближе к корню уже выбрана версия
+                    version = version and self.resolve_version(group_id, artifact_id, version)
+                    if not version:
+                        print(f"Не удалось определить версию {group_id}:{artifact_id}")
+                        continue
+                    selected[(group_id, artifact_id)] = version
+                    candidates.append((group_id, artifact_id, version, exclusions, root_managed))
+
+                # POM всего уровня скачиваются параллельно
+                models = list(executor.map(lambda c: self.effective_model(*c[:3]), candidates))
+
+                level = []
+                for (group_id, artifact_id, version, exclusions, root_managed), model in zip(candidates, models):
+                    if model is None:
+                        print(f"POM не найден: {group_id}:{artifact_id}:{version}")
+                        continue
+                    relocation = model["relocation"]
+                    if relocation and (relocation["group_id"], relocation["artifact_id"], relocation["version"]) != (group_id, artifact_id, version):
+                        # Артефакт перемещен: старые координаты содержат только POM
+                        with self.lock:
+                            self.pom_only.add((group_id, artifact_id, version))
+                        del selected[(group_id, artifact_id)]
+                        level.append((relocation["group_id"], relocation["artifact_id"], relocation["version"], exclusions, root_managed))
+                        continue
+                    level.extend(self.children(model, exclusions, root_managed, include_optional=False))
+
+        closure = [(g, a, v) for (g, a), v in selected.items()]
+        return closure
+
+    def children(self, model, exclusions, root_managed, include_optional):
+        """Зависимости модели, которые входят в замыкание."""
+        children = []
+        for dependency in model["dependencies"]:
+            group_id, artifact_id = dependency["group_id"], dependency["artifact_id"]
+            if (dependency["scope"] or "compile") not in INCLUDE_SCOPES:
+                continue
+            if dependency["optional"] == "true" and not include_optional:
+                continue
+            if any(g in ("*", group_id) and a in ("*", artifact_id) for g, a in exclusions):
+                continue
+            # dependencyManagement корневого проекта задает версии и транзитивных зависимостей
+            managed = root_managed.get(dependency_key(dependency))
+            version = (managed and managed["version"]) or dependency["version"]
+            children.append((group_id, artifact_id, version, exclusions | frozenset(dependency["exclusions"]), root_managed))
+        return children
+
+def parse_gav(gav):
+    group_id, artifact_id, version = gav.split(":")
+    return group_id, artifact_id, version
+
+def main():
+    resolver = PomResolver()
+    closure = resolver.resolve([parse_gav(gav) for gav in SEED_GAVS], SEED_POMS)
+    closure_set = set(closure)
+    pom_only = sorted(gav for gav in resolver.pom_only if gav not in closure_set and all(gav))
+    print(f"Зависимостей в замыкании: {len(closure)}, родительских POM и BOM: {len(pom_only)}")
+
+    artifacts = [
+        {"group_id": g, "artifact_id": a, "latest_version": v}
+        for g, a, v in closure + pom_only
+    ]
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+        json.dump({"artifacts": artifacts}, f, indent=2)
+    print(f"Замыкание сохранено в {OUTPUT_FILE}")
+
+    if DOWNLOAD_CLOSURE:
+        mirror.download_artifacts(artifacts)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import download_crates
+
+# Бенчмарк пропускной способности download_crates.py на локальном stub-реестре.
+# Сервер отвечает как API crates.io и static.crates.io, но с искусственной задержкой
+# на каждый запрос, чтобы имитировать сетевую задержку до crates.io. Как и настоящий
+# API, ссылка /download отвечает редиректом на статический файл.
+
+# Количество crates и версий у каждого
+BENCH_CRATES = 60
+BENCH_VERSIONS = 3
+
+# Размер одного .crate файла (в байтах)
+CRATE_SIZE = 64 * 1024
+
+# Искусственная задержка ответа сервера (в секундах)
+SERVER_LATENCY = 0.05
+
+# Варианты количества потоков для сравнения
+WORKER_COUNTS = [1, 4, 16, 32]
+
+# Стратегии получения ссылки на .crate (см. DOWNLOAD_URL_STRATEGY в download_crates.py)
+URL_STRATEGIES = ["api", "cdn"]
+
+CRATE_BODY = os.urandom(CRATE_SIZE)
+
+VERSIONS_RE = re.compile(r"^/api/v1/crates/([^/]+)/versions$")
+DOWNLOAD_RE = re.compile(r"^/api/v1/crates/([^/]+)/([^/]+)/download$")
+STATIC_RE = re.compile(r"^/static/crates/([^/]+)/([^/]+)\.crate$")
+
+class StubRegistryHandler(BaseHTTPRequestHandler):
+    """Минимальная имитация API crates.io с поддержкой keep-alive."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(SERVER_LATENCY)
+        if VERSIONS_RE.match(self.path):
+            versions = [{"num": f"1.0.{i}", "yanked": False} for i in range(BENCH_VERSIONS)]
+            self.send_body(json.dumps({"versions": versions}).encode(), "application/json")
+        elif DOWNLOAD_RE.match(self.path):
+            name, version = DOWNLOAD_RE.match(self.path).groups()
+            self.send_response(302)
+            self.send_header("Location", f"/static/crates/{name}/{name}-{version}.crate")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif STATIC_RE.match(self.path):
+            self.send_body(CRATE_BODY, "application/gzip")
+        else:
+            self.send_body(b"not found", "text/plain", status=404)
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def run_benchmark(base_url, strategy, workers):
+    """Скачивает тестовый набор с указанными стратегией и числом потоков, возвращает (файлов, секунд)."""
+    work_dir = tempfile.mkdtemp(prefix="crates_bench_")
+    try:
+        download_crates.DOWNLOAD_DIR = work_dir
+        download_crates.CRATES_API_URL = f"{base_url}/api/v1/crates"
+        download_crates.STATIC_CDN_URL = f"{base_url}/static/crates"
+        download_crates.DOWNLOAD_URL_STRATEGY = strategy
+        download_crates.MAX_CONNECTIONS_PER_HOST = workers
+        download_crates.session = download_crates.create_session()
+
+        progress = download_crates.ProgressStore(os.path.join(work_dir, "progress.json"),
+                                                 os.path.join(work_dir, "progress.jsonl"))
+        crates = [{"name": f"bench-crate-{i}"} for i in range(BENCH_CRATES)]
+        started = time.perf_counter()
+        download_crates.download_all_crates(crates, progress, max_workers=workers)
+        elapsed = time.perf_counter() - started
+        progress.close()
+
+        files = sum(len(names) for _, _, names in os.walk(os.path.join(work_dir, "crates")))
+        return files, elapsed
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubRegistryHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"Stub registry: {base_url}, {BENCH_CRATES} crates x {BENCH_VERSIONS} versions, "
+          f"{CRATE_SIZE // 1024} KiB, latency {SERVER_LATENCY * 1000:.0f} ms")
+    try:
+        for strategy in URL_STRATEGIES:
+            for workers in WORKER_COUNTS:
+                files, elapsed = run_benchmark(base_url, strategy, workers)
+                print(f"strategy={strategy:3s} workers={workers:3d}: {files} files in {elapsed:6.2f} s "
+                      f"({files / elapsed:7.1f} files/s, {files * CRATE_SIZE / elapsed / 1024 / 1024:6.1f} MiB/s)")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+# Вычисление транзитивного замыкания зависимостей по метаданным sparse-индекса.
+# Исходные точки - файлы Cargo.lock (точные версии) и Cargo.toml (требования к версиям).
+
+# Источники из Cargo.lock, которые считаются crates.io
+CRATES_IO_SOURCES = (
+    "registry+https://github.com/rust-lang/crates.io-index",
+    "sparse+https://index.crates.io/",
+)
+
+# Включать ли все optional-зависимости, а не только включенные через features
+INCLUDE_OPTIONAL_DEPENDENCIES = False
+
+# Включать ли dev-зависимости исходных Cargo.toml (у транзитивных зависимостей они не нужны)
+INCLUDE_DEV_DEPENDENCIES = True
+
+VERSION_RE = re.compile(r"^(\d+)(?:\.(\d+|\*|x|X))?(?:\.(\d+|\*|x|X))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+
+def parse_version(text):
+    """Разбирает версию semver в (major, minor, patch, prerelease)."""
+    match = VERSION_RE.match(text.strip())
+    if not match or not all(part and part.isdigit() for part in match.groups()[:3]):
+        raise ValueError(f"Invalid version: {text!r}")
+    major, minor, patch, pre = match.groups()
+    return int(major), int(minor), int(patch), pre or ""
+
+def version_key(version):
+    """Ключ сортировки версии по правилам semver (пре-релиз младше релиза)."""
+    major, minor, patch, pre = version
+    if not pre:
+        return major, minor, patch, 1, ()
+    identifiers = tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in pre.split('.'))
+    return major, minor, patch, 0, identifiers
+
+def parse_comparator(text):
+    """Переводит одно условие требования cargo в список пар (оператор, версия)."""
+    text = text.strip()
+    match = re.match(r"^(>=|<=|=|>|<|~|\^)?\s*(.*)$", text)
+    explicit_op, rest = match.group(1), match.group(2)
+    if rest in ("*", "x", "X", ""):
+        return []
+    parts = VERSION_RE.match(rest)
+    if not parts:
+        raise ValueError(f"Invalid version requirement: {text!r}")
+    major, minor_raw, patch_raw, pre = parts.groups()
+    major = int(major)
+    minor = int(minor_raw) if minor_raw and minor_raw.isdigit() else None
+    patch = int(patch_raw) if patch_raw and patch_raw.isdigit() else None
+    low = (major, minor or 0, patch or 0, pre or "")
+
+    # Неполная версия ("=1.2") и маска ("1.*", "1.2.x") задают диапазон, как "~"
+    op = explicit_op or "^"
+    has_wildcard = any(part in ("*", "x", "X") for part in (minor_raw, patch_raw))
+    if (op == "=" and patch is None) or (explicit_op is None and has_wildcard):
+        op = "~"
+
+    if op == "=":
+        return [("=", low)]
+    if op == ">=":
+        return [(">=", low)]
+    if op == "<":
+        return [("<", low)]
+    if op == ">":
+        if minor is None:
+            return [(">=", (major + 1, 0, 0, ""))]
+        if patch is None:
+            return [(">=", (major, minor + 1, 0, ""))]
+        return [(">", low)]
+    if op == "<=":
+        if minor is None:
+            return [("<", (major + 1, 0, 0, ""))]
+        if patch is None:
+            return [("<", (major, minor + 1, 0, ""))]
+        return [("<=", low)]
+    if op == "~":
+        if minor is None:
+            return [(">=", low), ("<", (major + 1, 0, 0, ""))]
+        return [(">=", low), ("<", (major, minor + 1, 0, ""))]
+    # "^" - совместимые версии: первый ненулевой компонент не меняется
+    if major > 0 or minor is None:
+        upper = (major + 1, 0, 0, "")
+    elif minor > 0 or patch is None:
+        upper = (0, minor + 1, 0, "")
+    else:
+        upper = (0, 0, patch + 1, "")
+    return [(">=", low), ("<", upper)]
+
+def parse_requirement(text):
+    """Разбирает требование cargo ("^1.2, <1.5") в список условий."""
+    comparators = []
+    for part in (text or "*").split(','):
+        comparators.extend(parse_comparator(part))
+    return comparators
+
+def matches(requirement, version):
+    """Проверяет, удовлетворяет ли версия всем условиям требования.
+
+    Пре-релизы подходят, только если требование само упоминает пре-релиз
+    той же версии major.minor.patch (как в cargo).
+    """
+    if version[3] and not any(bound[3] and bound[:3] == version[:3] for _, bound in requirement):
+        return False
+    key = version_key(version)
+    for op, bound in requirement:
+        bound_key = version_key(bound)
+        if op == "=" and key != bound_key:
+            return False
+        if op == ">=" and key < bound_key:
+            return False
+        if op == ">" and key <= bound_key:
+            return False
+        if op == "<" and key >= bound_key:
+            return False
+        if op == "<=" and key > bound_key:
+            return False
+    return True
+
+def read_cargo_lock(path):
+    """Возвращает точные версии crates.io из Cargo.lock: [(имя, версия)]."""
+    with open(path, 'rb') as f:
+        lock = tomllib.load(f)
+    return [
+        (package["name"], package["version"])
+        for package in lock.get("package", [])
+        if package.get("source", "").startswith(CRATES_IO_SOURCES)
+    ]
+
+def read_cargo_toml(path):
+    """Возвращает зависимости из Cargo.toml: [(crate, требование, features, default_features)].
+
+    Зависимости из git, path и других реестров пропускаются.
+    """
+    with open(path, 'rb') as f:
+        manifest = tomllib.load(f)
+
+    tables = [manifest, manifest.get("workspace", {})]
+    tables.extend(manifest.get("target", {}).values())
+    sections = ["dependencies", "build-dependencies"]
+    if INCLUDE_DEV_DEPENDENCIES:
+        sections.append("dev-dependencies")
+
+    dependencies = []
+    for table in tables:
+        for section in sections:
+            for key, spec in table.get(section, {}).items():
+                if isinstance(spec, str):
+                    spec = {"version": spec}
+                if spec.get("workspace") or any(source in spec for source in ("git", "path", "registry")):
+                    continue
+                dependencies.append((
+                    spec.get("package", key),
+                    spec.get("version", "*"),
+                    spec.get("features", []),
+                    spec.get("default-features", spec.get("default_features", True)),
+                ))
+    return dependencies
+
+class ClosureResolver:
+    """Вычисляет замыкание зависимостей по записям sparse-индекса.
+
+    Для каждого требования выбирается наибольшая подходящая неотозванная версия.
+    Features учитываются так же, как в cargo: optional-зависимость попадает в
+    замыкание, только если ее включает какая-нибудь активная feature.
+    """
+
+    def __init__(self, index, max_workers=16):
+        self.index = index
+        self.max_workers = max_workers
+        self.entries = {}
+        # (crate, версия) -> множество активных features
+        self.resolved = {}
+
+    def _prefetch(self, names):
+        """Загружает записи индекса для новых crates параллельно."""
+        names = [name for name in set(names) if name not in self.entries]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for name, entries in zip(names, executor.map(self._get_entries, names)):
+                self.entries[name] = entries
+
+    def _get_entries(self, name):
+        try:
+            return self.index.get_entries(name)
+        except Exception as e:
+            logging.error(f"Error reading sparse index for {name}: {e}")
+            return []
+
+    def _select(self, name, requirement):
+        """Выбирает версию crate для требования (запись индекса или None)."""
+        try:
+            parsed = parse_requirement(requirement)
+        except ValueError as e:
+            logging.warning(f"{name}: {e}")
+            return None
+        best = None
+        for entry in self.entries.get(name, []):
+            try:
+                version = parse_version(entry["vers"])
+            except ValueError:
+                continue
+            if entry.get("yanked") or not matches(parsed, version):
+                continue
+            if best is None or version_key(version) > version_key(best[0]):
+                best = (version, entry)
+        return best[1] if best else None
+
+    @staticmethod
+    def _expand_features(entry, requested):
+        """Раскрывает features транзитивно.
+
+        Возвращает (включенные optional-зависимости, {зависимость: ее features}).
+        """
+        feature_map = dict(entry.get("features", {}))
+        feature_map.update(entry.get("features2", {}))
+        optional = {dep["name"] for dep in entry.get("deps", []) if dep.get("optional")}
+
+        features = set()
+        enabled_deps = set()
+        dep_features = {}
+        stack = list(requested)
+        while stack:
+            feature = stack.pop()
+            if feature in features:
+                continue
+            features.add(feature)
+            for item in feature_map.get(feature, []):
+                if item.startswith("dep:"):
+                    enabled_deps.add(item[4:])
+                elif "/" in item:
+                    dep_name, dep_feature = item.split("/", 1)
+                    weak = dep_name.endswith("?")
+                    dep_name = dep_name.rstrip("?")
+                    if not weak:
+                        enabled_deps.add(dep_name)
+                        if dep_name in feature_map:
+                            stack.append(dep_name)
+                    dep_features.setdefault(dep_name, set()).add(dep_feature)
+                elif item in feature_map:
+                    stack.append(item)
+                elif item in optional:
+                    enabled_deps.add(item)
+            # Неявная feature с именем optional-зависимости
+            if feature in optional and feature not in feature_map:
+                enabled_deps.add(feature)
+        return enabled_deps, dep_features
+
+    def resolve(self, requirements, pinned=()):
+        """Вычисляет замыкание.
+
+        requirements - [(crate, требование, features, default_features)] из Cargo.toml,
+        pinned - [(crate, версия)] из Cargo.lock. Возвращает {crate: {версия: запись индекса}}.
+        """
+        # Cargo.lock уже содержит полное замыкание, поэтому его версии берутся как есть
+        # (в том числе отозванные) и не раскрываются повторно
+        self._prefetch(name for name, _ in pinned)
+        for name, version in pinned:
+            if any(entry["vers"] == version for entry in self.entries[name]):
+                self.resolved.setdefault((name, version), set())
+            else:
+                logging.warning(f"{name} {version} from Cargo.lock not found in index")
+
+        queue = list(requirements)
+        while queue:
+            self._prefetch(name for name, *_ in queue)
+            next_queue = []
+            for name, requirement, requested, default_features in queue:
+                entry = self._select(name, requirement)
+                if entry is None:
+                    logging.warning(f"No version of {name} matches {requirement!r}")
+                    continue
+                key = (name, entry["vers"])
+                requested = set(requested)
+                if default_features:
+                    requested.add("default")
+                active = self.resolved.get(key)
+                if active is not None and requested <= active:
+                    continue  # Эта версия уже обработана с теми же features
+                active = (active or set()) | requested
+                self.resolved[key] = active
+
+                enabled_deps, dep_features = self._expand_features(entry, active)
+                for dep in entry.get("deps", []):
+                    if dep.get("kind") == "dev":
+                        continue
+                    if dep.get("optional") and not INCLUDE_OPTIONAL_DEPENDENCIES and dep["name"] not in enabled_deps:
+                        continue
+                    if dep.get("registry"):
+                        continue  # Зависимость из другого реестра
+                    features = set(dep.get("features", [])) | dep_features.get(dep["name"], set())
+                    next_queue.append((dep.get("package") or dep["name"], dep["req"], features,
+                                       dep.get("default_features", True)))
+            queue = next_queue
+
+        closure = {}
+        for name, version in self.resolved:
+            entry = next(e for e in self.entries[name] if e["vers"] == version)
+            closure.setdefault(name, {})[version] = entry
+        return closure
+
+    def latest_versions(self, name, count):
+        """Возвращает count последних неотозванных версий crate (записи индекса)."""
+        entries = [entry for entry in self.entries.get(name, []) if not entry.get("yanked")]
+        return entries[-count:] if count else []
+
+def resolve_seed_files(index, seed_files, latest_versions=0):
+    """Строит замыкание зависимостей по Cargo.lock/Cargo.toml.
+
+    Возвращает список crates в формате download_crates.py: [{"name", "versions"}],
+    где versions - точный набор версий (num, checksum, yanked) для скачивания.
+    """
+    requirements = []
+    pinned = []
+    for path in seed_files:
+        if os.path.basename(path) == "Cargo.lock":
+            pinned.extend(read_cargo_lock(path))
+        else:
+            requirements.extend(read_cargo_toml(path))
+    logging.info(f"Seed files: {len(pinned)} locked packages, {len(requirements)} manifest dependencies")
+
+    resolver = ClosureResolver(index)
+    closure = resolver.resolve(requirements, pinned)
+    for name in closure:
+        for entry in resolver.latest_versions(name, latest_versions):
+            closure[name].setdefault(entry["vers"], entry)
+
+    crates = []
+    for name in sorted(closure):
+        entries = sorted(closure[name].values(), key=lambda e: version_key(parse_version(e["vers"])), reverse=True)
+        crates.append({
+            "name": name,
+            "versions": [{"num": e["vers"], "checksum": e["cksum"], "yanked": e.get("yanked", False)} for e in entries],
+        })
+    total_versions = sum(len(crate["versions"]) for crate in crates)
+    logging.info(f"Dependency closure: {len(crates)} crates, {total_versions} versions")
+    return crates
@@ -1,41 +1,151 @@
 import requests
 import json
+import os
 import time
+from datetime import datetime
 
 # Константа с именем файла для сохранения списка crates
 CRATES_LIST_FILE = "crates_list.json"
 
-# URL для получения списка всех crates
-CRATES_LIST_URL = "https://crates.io/api/v1/crates?per_page=100&page={page}"
+# Файл с отметкой времени последнего обновления (updated_at самого свежего crate прошлого запуска)
+CRATES_LIST_STATE_FILE = "crates_list_state.json"
+
+# True - заново скачать весь каталог; False - дозагрузить только изменившиеся crates
+# (если сохраненного списка еще нет, все равно выполняется полная загрузка)
+FULL_REFRESH = False
+
+CRATES_API_URL = "https://crates.io/api/v1/crates"
+
+# URL первой страницы списка всех crates (следующие страницы - по meta.next_page)
+CRATES_LIST_URL = f"{CRATES_API_URL}?per_page=100"
+
+# URL списка crates, отсортированного по времени последнего обновления (сначала свежие)
+RECENT_UPDATES_URL = f"{CRATES_API_URL}?per_page=100&sort=recent-updates"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
 
 def get_all_crates():
+    """Получает весь каталог crates постранично.
+
+    При ошибке страницы выбрасывает исключение: неполный список нельзя сохранять вместе
+    с отметкой времени, иначе непрочитанные crates не появятся и при дозагрузке.
+    """
     crates = []
+    url = CRATES_LIST_URL
     page = 1
-    while True:
+    while url:
         print(f"Fetching page {page}...")
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(CRATES_LIST_URL.format(page=page), headers=headers)
+        response = requests.get(url, headers=HEADERS)
         if response.status_code != 200:
             print(f"Failed to fetch page {page}. Status code: {response.status_code}")
-            break
+            raise RuntimeError("Full refresh interrupted, saved list is left unchanged")
         data = response.json()
         crates.extend(data['crates'])
-        if not data['meta']['next_page']:
-            break
+        # Как и при дозагрузке, переходим по next_page из ответа (номер страницы или seek)
+        next_page = data['meta']['next_page']
+        url = f"{CRATES_API_URL}{next_page}" if next_page else None
+        page += 1
+        time.sleep(1)  # Задержка в 1 секунду между запросами
+    return crates
+
+def parse_time(value):
+    """Разбирает время из API crates.io (ISO 8601)."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def get_updated_crates(high_water):
+    """Получает crates, обновленные после high_water (по убыванию updated_at).
+
+    Список отсортирован по времени обновления, поэтому листание останавливается
+    на первом crate, который не менялся с прошлого запуска.
+    """
+    crates = []
+    url = RECENT_UPDATES_URL
+    page = 1
+    while url:
+        print(f"Fetching recent updates page {page}...")
+        response = requests.get(url, headers=HEADERS)
+        if response.status_code != 200:
+            print(f"Failed to fetch page {page}. Status code: {response.status_code}")
+            raise RuntimeError("Incremental refresh interrupted, saved list is left unchanged")
+        data = response.json()
+        for crate in data['crates']:
+            if parse_time(crate['updated_at']) < high_water:
+                return crates
+            crates.append(crate)
+        # next_page - строка запроса к следующей странице ("?page=2&..." или "?seek=...")
+        next_page = data['meta']['next_page']
+        url = f"{CRATES_API_URL}{next_page}" if next_page else None
         page += 1
         time.sleep(1)  # Задержка в 1 секунду между запросами
     return crates
 
+def load_crates_list():
+    """Загружает сохраненный список crates (None, если его нет)."""
+    try:
+        with open(CRATES_LIST_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def load_high_water(crates):
+    """Возвращает отметку прошлого запуска: из файла состояния или по сохраненному списку."""
+    try:
+        with open(CRATES_LIST_STATE_FILE, 'r') as f:
+            return parse_time(json.load(f)['high_water_updated_at'])
+    except FileNotFoundError:
+        pass
+    if not crates:
+        return None
+    return max(parse_time(crate['updated_at']) for crate in crates)
+
+def save_high_water(crates):
+    """Сохраняет updated_at самого свежего crate как отметку для следующего запуска."""
+    if not crates:
+        return
+    high_water = max(crates, key=lambda crate: parse_time(crate['updated_at']))['updated_at']
+    with open(CRATES_LIST_STATE_FILE, 'w') as f:
+        json.dump({"high_water_updated_at": high_water}, f)
+
+def merge_crates(crates, updated):
+    """Заменяет изменившиеся crates в списке и добавляет новые в конец."""
+    index = {crate['id']: i for i, crate in enumerate(crates)}
+    added = 0
+    for crate in updated:
+        if crate['id'] in index:
+            crates[index[crate['id']]] = crate
+        else:
+            index[crate['id']] = len(crates)
+            crates.append(crate)
+            added += 1
+    print(f"Updated {len(updated) - added} crates, added {added} new crates")
+    return crates
+
 def save_crates_list(crates):
-    with open(CRATES_LIST_FILE, 'w') as f:
+    tmp_file = CRATES_LIST_FILE + ".tmp"
+    with open(tmp_file, 'w') as f:
         json.dump(crates, f, indent=2)
+    os.replace(tmp_file, CRATES_LIST_FILE)
     print(f"Saved {len(crates)} crates to {CRATES_LIST_FILE}")
 
 def main():
-    crates = get_all_crates()
-    save_crates_list(crates)
+    crates = None if FULL_REFRESH else load_crates_list()
+    high_water = load_high_water(crates) if crates else None
+
+    if high_water is None:
+        print("Full refresh...")
+        crates = get_all_crates()
+        save_crates_list(crates)
+        save_high_water(crates)
+        return
+
+    print(f"Incremental refresh: crates updated since {high_water.isoformat()}")
+    updated = get_updated_crates(high_water)
+    print(f"Found {len(updated)} updated crates")
+    if updated:
+        save_crates_list(merge_crates(crates, updated))
+        save_high_water(updated)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,144 @@
+import json
+import os
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sparse_index import SparseIndex, index_path
+
+# Скрипт строит sparse-индекс cargo для зеркала, скачанного download_crates.py.
+# Индекс кладется рядом с crates/, поэтому весь DOWNLOAD_DIR можно отдать любым
+# статическим HTTP-сервером и указать его cargo как sparse-реестр.
+
+# Каталог зеркала (тот же, что DOWNLOAD_DIR в download_crates.py)
+DOWNLOAD_DIR = "i://rust_crates_mirror"
+
+# Каталог, в который пишется индекс
+INDEX_OUTPUT_DIR = os.path.join(DOWNLOAD_DIR, "index")
+
+# Адрес, по которому зеркало (DOWNLOAD_DIR) доступно по HTTP
+MIRROR_URL = "http://localhost:8080"
+
+# Откуда брать метаданные версий (зависимости, features, cksum):
+# локальная копия индекса crates.io или sparse-индекс по HTTP с кэшем
+SPARSE_INDEX_URL = "https://index.crates.io"
+SPARSE_INDEX_DIR = None
+INDEX_CACHE_DIR = "index_cache"
+
+# Сколько секунд доверять кэшу индекса без запроса к серверу
+INDEX_CACHE_TTL = 7 * 24 * 3600
+
+# Файл состояния: какие версии каждого crate уже записаны в индекс
+INDEX_STATE_FILE = os.path.join(INDEX_OUTPUT_DIR, ".index_state.json")
+
+# True - переписать индекс всех crates (например, чтобы обновить флаги yanked)
+REBUILD_ALL = False
+
+# Количество потоков для получения метаданных
+MAX_WORKERS = 16
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+
+def scan_mirror(crates_dir):
+    """Возвращает {имя crate: отсортированный список скачанных версий}."""
+    mirrored = {}
+    with os.scandir(crates_dir) as crate_entries:
+        for crate_entry in crate_entries:
+            if not crate_entry.is_dir():
+                continue
+            name = crate_entry.name
+            versions = []
+            with os.scandir(crate_entry.path) as version_entries:
+                for version_entry in version_entries:
+                    crate_file = os.path.join(version_entry.path, f"{name}-{version_entry.name}.crate")
+                    if version_entry.is_dir() and os.path.exists(crate_file):
+                        versions.append(version_entry.name)
+            if versions:
+                mirrored[name] = sorted(versions)
+    return mirrored
+
+def load_state():
+    try:
+        with open(INDEX_STATE_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def write_file(path, text):
+    """Записывает файл атомарно через временный файл."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def write_config():
+    """Пишет config.json реестра: cargo скачивает .crate по шаблону dl."""
+    config = {"dl": f"{MIRROR_URL}/crates/{{crate}}/{{version}}/{{crate}}-{{version}}.crate"}
+    write_file(os.path.join(INDEX_OUTPUT_DIR, "config.json"), json.dumps(config, indent=2))
+
+def build_crate_index(upstream_index, name, versions):
+    """Пишет файл индекса crate только с теми версиями, которые есть в зеркале.
+
+    Возвращает (количество записанных версий, версии без метаданных в индексе).
+    """
+    local_versions = set(versions)
+    entries = [entry for entry in upstream_index.get_entries(name) if entry["vers"] in local_versions]
+    missing = local_versions - {entry["vers"] for entry in entries}
+    if missing:
+        # Кэш индекса мог устареть (версия опубликована после проверки) - запрашиваем файл заново
+        entries = [entry for entry in upstream_index.get_entries(name, refresh=True) if entry["vers"] in local_versions]
+        missing = local_versions - {entry["vers"] for entry in entries}
+    if missing:
+        logging.warning(f"{name}: no index metadata for versions {sorted(missing)}, will retry on next run")
+    if entries:
+        text = "".join(json.dumps(entry, separators=(',', ':')) + "\n" for entry in entries)
+        write_file(os.path.join(INDEX_OUTPUT_DIR, *index_path(name).split('/')), text)
+    return len(entries), missing
+
+def main():
+    upstream_index = SparseIndex(url=SPARSE_INDEX_URL, local_dir=SPARSE_INDEX_DIR,
+                                 cache_dir=INDEX_CACHE_DIR, cache_ttl=INDEX_CACHE_TTL)
+
+    mirrored = scan_mirror(os.path.join(DOWNLOAD_DIR, "crates"))
+    state = {} if REBUILD_ALL else load_state()
+    changed = [name for name, versions in mirrored.items() if state.get(name) != versions]
+    logging.info(f"Mirrored crates: {len(mirrored)}, changed since last run: {len(changed)}")
+
+    write_config()
+
+    def update(name):
+        try:
+            # Crate без метаданных хотя бы одной версии не отмечается в состоянии и строится снова
+            written, missing = build_crate_index(upstream_index, name, mirrored[name])
+            return name, written > 0 and not missing
+        except Exception as e:
+            logging.error(f"Failed to build index for {name}: {e}")
+            return name, False
+
+    updated = 0
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for name, ok in executor.map(update, changed):
+            if ok:
+                state[name] = mirrored[name]
+                updated += 1
+
+    # Crates, удаленные из зеркала, убираем из индекса, чтобы cargo не пытался их скачать
+    for name in list(state):
+        if name not in mirrored:
+            del state[name]
+            index_file = os.path.join(INDEX_OUTPUT_DIR, *index_path(name).split('/'))
+            if os.path.exists(index_file):
+                os.remove(index_file)
+    write_file(INDEX_STATE_FILE, json.dumps(state))
+
+    logging.info(f"Index files rewritten: {updated}")
+    upstream_index.log_stats()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
 import requests
+from requests.adapters import HTTPAdapter
+import hashlib
 import os
 import json
 import time
 import logging
 import signal
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from sparse_index import SparseIndex, expand_dl_template
+# Общая очередь задач лежит в каталоге common репозитория
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from work_queue import WorkQueue
 
 # Константа с конечным каталогом для скачивания
 DOWNLOAD_DIR = "i://rust_crates_mirror"
@@ -12,20 +21,77 @@ DOWNLOAD_DIR = "i://rust_crates_mirror"
 # Файл со списком crates
 CRATES_LIST_FILE = "filtered_crates.json"
 
-# Файл для сохранения прогресса
+# Файл для сохранения прогресса (снимок, в который периодически сворачивается журнал)
 PROGRESS_FILE = "progress.json"
 
+# Журнал прогресса: по одной JSON-записи на каждую скачанную версию, только дописывание
+PROGRESS_JOURNAL_FILE = "progress.jsonl"
+
+# Через сколько записей журнала сворачивать его в PROGRESS_FILE
+PROGRESS_COMPACT_EVERY = 5000
+
+# Манифест контрольных сумм скачанных файлов (в DOWNLOAD_DIR, формат sha256sum)
+CHECKSUM_MANIFEST_FILE = "checksums.sha256"
+
 # Сколько последних версий скачивать (например, 3 последние версии)
 MAX_VERSIONS_TO_DOWNLOAD = 3
 
 # Задержка между запросами (в секундах)
 REQUEST_DELAY = 0
 
-# Имя crate, с которого начать скачивание (если None, начнет с первого)
+# Режим замыкания зависимостей: список файлов Cargo.lock/Cargo.toml наших проектов.
+# Если список не пустой, вместо CRATES_LIST_FILE скачиваются ровно те версии, которые
+# нужны этим проектам (транзитивно, по метаданным sparse-индекса)
+SEED_FILES = []  # Например, ["d:/projects/app/Cargo.lock", "d:/projects/lib/Cargo.toml"]
+
+# В режиме замыкания дополнительно скачивать столько последних версий каждого crate
+CLOSURE_LATEST_VERSIONS = 0
+
+# Имя crate, с которого начать скачивание (если None, начнет с первого).
+# Не применяется в режиме замыкания (SEED_FILES) и с общей очередью
 START_FROM_CRATE = 'fitimer'  # Например, "serde"
 
-# Создаем каталог для скачивания, если он не существует
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+# Общая очередь задач (файл SQLite). Если указана, список crates переносится в очередь
+# (когда в ней нет невыполненных задач), и ее могут параллельно разбирать несколько процессов или машин
+# (с общим томом): каждый crate берется в аренду, а после падения исполнителя
+# аренда истекает и crate забирает другой. START_FROM_CRATE в этом режиме не нужен
+WORK_QUEUE_FILE = None  # Например, "crates_queue.sqlite"
+
+# Базовый URL API crates.io (можно заменить на локальный сервер, например для бенчмарка)
+CRATES_API_URL = "https://crates.io/api/v1/crates"
+
+# Источник списка версий: "sparse" - sparse-индекс crates.io (index.crates.io),
+# "api" - отдельный запрос к /api/v1/crates/{name}/versions на каждый crate
+VERSION_SOURCE = "sparse"
+
+# URL sparse-индекса
+SPARSE_INDEX_URL = "https://index.crates.io"
+
+# Локальная копия индекса (git clone https://github.com/rust-lang/crates.io-index).
+# Если указана, версии читаются из нее без сетевых запросов
+SPARSE_INDEX_DIR = None
+
+# Каталог кэша файлов sparse-индекса (ETag/Last-Modified для условных запросов)
+INDEX_CACHE_DIR = "index_cache"
+
+# Откуда скачивать .crate файлы:
+# "cdn"   - напрямую со static.crates.io (без редиректа через API),
+# "index" - по шаблону dl из config.json sparse-индекса,
+# "api"   - через /api/v1/crates/{name}/{version}/download (API отвечает редиректом на CDN).
+# При ошибке прямой ссылки делается повторная попытка через API
+DOWNLOAD_URL_STRATEGY = "cdn"
+
+# Базовый URL статического CDN crates.io
+STATIC_CDN_URL = "https://static.crates.io/crates"
+
+# Пропускать версии, отозванные автором (yanked)
+SKIP_YANKED = False
+
+# Сколько crates скачивать одновременно (общее ограничение параллелизма)
+MAX_WORKERS = 16
+
+# Максимум одновременных соединений к одному хосту
+MAX_CONNECTIONS_PER_HOST = 8
 
 # Заголовки для запросов
 HEADERS = {
@@ -55,6 +121,31 @@ def signal_handler(sig, frame):
 # Регистрируем обработчик сигнала
 signal.signal(signal.SIGINT, signal_handler)
 
+def create_session():
+    """Создает общую HTTP-сессию с пулом keep-alive соединений.
+
+    pool_block=True не дает открыть к одному хосту больше
+    MAX_CONNECTIONS_PER_HOST соединений: лишние потоки ждут свободное.
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONNECTIONS_PER_HOST, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Общая сессия для всех потоков
+session = create_session()
+
+# Sparse-индекс, создается в main() при VERSION_SOURCE = "sparse"
+crate_index = None
+
+# Шаблон dl из config.json индекса, загружается в main() при DOWNLOAD_URL_STRATEGY = "index"
+download_url_template = None
+
+# Манифест контрольных сумм, создается в main()
+checksum_manifest = None
+
 def load_crates_list():
     """Загружает список crates из файла."""
     try:
@@ -64,32 +155,166 @@ def load_crates_list():
         logging.error(f"Failed to load crates list: {e}")
         return []
 
-def load_progress():
-    """Загружает прогресс скачивания из файла."""
-    try:
-        with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}  # Если файл прогресса не существует, возвращаем пустой словарь
-    except Exception as e:
-        logging.error(f"Failed to load progress: {e}")
-        return {}
+def open_journal(path):
+    """Открывает журнал на дописывание и завершает недописанную последнюю строку,
+    чтобы новая запись не склеилась с ней."""
+    journal = open(path, 'a', encoding='utf-8')
+    if journal.tell() > 0:
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                journal.write("\n")
+    return journal
 
-def save_progress(progress):
-    """Сохраняет прогресс скачивания в файл."""
-    try:
-        with open(PROGRESS_FILE, 'w') as f:
-            json.dump(progress, f, indent=2)
-    except Exception as e:
-        logging.error(f"Failed to save progress: {e}")
+class ProgressStore:
+    """Прогресс скачивания: снимок в JSON плюс журнал дописываемых записей.
+
+    Каждая скачанная версия дописывается в журнал одной строкой, поэтому запись
+    стоит O(1), а сбой посреди записи портит максимум последнюю строку журнала.
+    Раз в compact_every записей журнал сворачивается в снимок (через временный
+    файл и атомарное переименование) и очищается. При compact_every=None журнал
+    не сворачивается: так в него могут дописывать несколько процессов сразу.
+    Все методы потокобезопасны.
+    """
+
+    def __init__(self, snapshot_file, journal_file, compact_every=PROGRESS_COMPACT_EVERY):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.compact_every = compact_every
+        self.lock = threading.Lock()
+        self.done = {}
+        self.journal_records = 0
+        self.load()
+        self.journal = open_journal(self.journal_file)
+
+    def load(self):
+        """Загружает снимок и проигрывает поверх него журнал."""
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                for crate_name, versions in json.load(f).items():
+                    self.done[crate_name] = set(versions)
+        except FileNotFoundError:
+            pass  # Если файл прогресса не существует, начинаем с пустого прогресса
+        except Exception as e:
+            logging.error(f"Failed to load progress: {e}")
+
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Недописанная строка после аварийного завершения
+                        logging.warning(f"Skipping broken progress record: {line.strip()!r}")
+                        continue
+                    self.done.setdefault(record['crate'], set()).add(record['version'])
+                    self.journal_records += 1
+        except FileNotFoundError:
+            pass
+
+    def is_done(self, crate_name, version):
+        """Проверяет, была ли версия уже скачана."""
+        with self.lock:
+            return version in self.done.get(crate_name, ())
+
+    def mark_done(self, crate_name, version):
+        """Дописывает запись о скачанной версии в журнал."""
+        with self.lock:
+            versions = self.done.setdefault(crate_name, set())
+            if version in versions:
+                return
+            versions.add(version)
+            self.journal.write(json.dumps({"crate": crate_name, "version": version}) + "\n")
+            self.journal.flush()
+            self.journal_records += 1
+            if self.compact_every and self.journal_records >= self.compact_every:
+                self._compact()
+
+    def compact(self):
+        """Сворачивает журнал в снимок."""
+        with self.lock:
+            self._compact()
+
+    def _compact(self):
+        try:
+            tmp_file = self.snapshot_file + ".tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({name: sorted(versions) for name, versions in self.done.items()}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            # Журнал очищаем только после того, как снимок гарантированно записан
+            self.journal.truncate(0)
+            self.journal.seek(0)
+            self.journal_records = 0
+        except Exception as e:
+            logging.error(f"Failed to save progress: {e}")
+
+    def close(self):
+        """Сворачивает журнал и закрывает файл."""
+        with self.lock:
+            if self.compact_every and self.journal_records:
+                self._compact()
+            self.journal.close()
+
+class ChecksumManifest:
+    """Манифест SHA-256 скачанных файлов в формате sha256sum.
+
+    После каждого проверенного файла дописывается строка
+    "<sha256>  crates/<name>/<version>/<name>-<version>.crate", поэтому зеркало
+    можно проверить командой sha256sum -c, а следующие запуски доверяют
+    манифесту и не перечитывают уже скачанные файлы.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.checksums = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    checksum, sep, relative_path = line.rstrip("\n").partition("  ")
+                    if sep and len(checksum) == 64:
+                        self.checksums[relative_path] = checksum
+        except FileNotFoundError:
+            pass
+        self.file = open_journal(path)
+
+    def get(self, relative_path):
+        with self.lock:
+            return self.checksums.get(relative_path)
+
+    def add(self, relative_path, checksum):
+        with self.lock:
+            if self.checksums.get(relative_path) == checksum:
+                return
+            self.checksums[relative_path] = checksum
+            self.file.write(f"{checksum}  {relative_path}\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
 
 def get_crate_versions(crate_name):
-    """Получает список версий для crate."""
+    """Получает список версий для crate (от новых к старым).
+
+    Каждая версия - словарь с ключами num, checksum и yanked.
+    """
     if shutdown_flag:
         return []
+    if crate_index is not None:
+        try:
+            versions = crate_index.get_versions(crate_name)
+            if not versions:
+                logging.error(f"Crate {crate_name} not found in sparse index")
+            return versions
+        except Exception as e:
+            logging.error(f"Error reading sparse index for {crate_name}: {e}")
+            return []
     try:
-        versions_url = f"https://crates.io/api/v1/crates/{crate_name}/versions"
-        response = requests.get(versions_url, headers=HEADERS)
+        versions_url = f"{CRATES_API_URL}/{crate_name}/versions"
+        response = session.get(versions_url)
         if response.status_code == 200:
             return response.json()['versions']
         else:
@@ -99,90 +324,262 @@ def get_crate_versions(crate_name):
         logging.error(f"Error fetching versions for {crate_name}: {e}")
         return []
 
-def download_crate_version(crate_name, version, progress):
-    """Скачивает конкретную версию crate."""
-    if shutdown_flag:
-        return
+def get_download_urls(crate_name, version, checksum=None):
+    """Возвращает ссылки на .crate в порядке попыток: прямая ссылка, затем API."""
+    api_url = f"{CRATES_API_URL}/{crate_name}/{version}/download"
+    if DOWNLOAD_URL_STRATEGY == "cdn":
+        return [f"{STATIC_CDN_URL}/{crate_name}/{crate_name}-{version}.crate", api_url]
+    if DOWNLOAD_URL_STRATEGY == "index" and download_url_template:
+        return [expand_dl_template(download_url_template, crate_name, version, checksum), api_url]
+    return [api_url]
+
+def fetch_crate_file(download_url, file_path, expected_checksum=None):
+    """Скачивает файл по ссылке, считая SHA-256 по ходу скачивания.
+
+    Данные пишутся во временный файл, который переименовывается в file_path
+    только если контрольная сумма совпала с ожидаемой (если она известна).
+    Возвращает SHA-256 файла или None, если ссылка не отдала корректный файл.
+    """
+    tmp_path = file_path + ".part"
     try:
-        download_url = f"https://crates.io/api/v1/crates/{crate_name}/{version}/download"
-        logging.info(f"Download URL for {crate_name} {version}: {download_url}")
-        
-        # Проверка, была ли версия уже скачана
-        if crate_name in progress and version in progress[crate_name]:
-            logging.info(f"Skipping {crate_name} {version}, already downloaded.")
-            return
-        
         # Проверка доступности ссылки с учетом перенаправлений
-        response = requests.get(download_url, headers=HEADERS, stream=True)
-        if response.status_code == 200:
+        with session.get(download_url, stream=True) as response:
+            if response.status_code != 200:
+                logging.warning(f"Link is invalid: {download_url}. Status code: {response.status_code}")
+                return None
             logging.info(f"Link is valid: {download_url}")
-            # Создаем структуру каталогов, аналогичную crates.io
-            crate_dir = os.path.join(DOWNLOAD_DIR, "crates", crate_name, version)
-            os.makedirs(crate_dir, exist_ok=True)
-            
-            # Сохраняем файл с понятным именем
-            file_path = os.path.join(crate_dir, f"{crate_name}-{version}.crate")
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
+            sha256 = hashlib.sha256()
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=65536):
                     if chunk:
+                        sha256.update(chunk)
                         f.write(chunk)
-            
-            # Обновляем прогресс
-            if crate_name not in progress:
-                progress[crate_name] = []
-            progress[crate_name].append(version)
-            save_progress(progress)
-            
-            logging.info(f"Downloaded {crate_name} {version} to {file_path}")
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"Error fetching {download_url}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+    checksum = sha256.hexdigest()
+    if expected_checksum and checksum != expected_checksum:
+        logging.error(f"Checksum mismatch for {download_url}: expected {expected_checksum}, got {checksum}")
+        os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, file_path)
+    return checksum
+
+def download_crate_version(crate_name, version, progress, checksum=None):
+    """Скачивает конкретную версию crate и проверяет ее SHA-256 (если он известен).
+
+    Возвращает True, если версия скачана (или уже была скачана раньше).
+    """
+    if shutdown_flag:
+        return False
+    try:
+        # Проверка, была ли версия уже скачана
+        if progress.is_done(crate_name, version):
+            logging.info(f"Skipping {crate_name} {version}, already downloaded.")
+            return True
+
+        # Создаем структуру каталогов, аналогичную crates.io
+        crate_dir = os.path.join(DOWNLOAD_DIR, "crates", crate_name, version)
+        os.makedirs(crate_dir, exist_ok=True)
+
+        # Сохраняем файл с понятным именем
+        file_path = os.path.join(crate_dir, f"{crate_name}-{version}.crate")
+        relative_path = f"crates/{crate_name}/{version}/{crate_name}-{version}.crate"
+
+        # Файл уже проверен в одном из прошлых запусков - доверяем манифесту и не перечитываем его
+        if checksum_manifest is not None and os.path.exists(file_path):
+            known_checksum = checksum_manifest.get(relative_path)
+            if known_checksum and (checksum is None or known_checksum == checksum):
+                logging.info(f"Skipping {crate_name} {version}, verified by checksum manifest.")
+                progress.mark_done(crate_name, version)
+                return True
+
+        for download_url in get_download_urls(crate_name, version, checksum):
+            logging.info(f"Download URL for {crate_name} {version}: {download_url}")
+            file_checksum = fetch_crate_file(download_url, file_path, checksum)
+            if file_checksum:
+                break
         else:
-            logging.error(f"Link is invalid: {download_url}. Status code: {response.status_code}")
+            logging.error(f"Failed to download {crate_name} {version}")
+            return False
+
+        if checksum_manifest is not None:
+            checksum_manifest.add(relative_path, file_checksum)
+
+        # Обновляем прогресс
+        progress.mark_done(crate_name, version)
+
+        logging.info(f"Downloaded {crate_name} {version} to {file_path}")
+        return True
     except Exception as e:
         logging.error(f"Error downloading {crate_name} {version}: {e}")
+        return False
 
 def download_crate(crate, progress):
-    """Скачивает последние версии crate."""
+    """Скачивает последние версии crate.
+
+    Возвращает True, если скачаны все выбранные версии.
+    """
     if shutdown_flag:
-        return
+        return False
     crate_name = crate['name']
-    versions = get_crate_versions(crate_name)
-    
-    # Ограничиваем количество скачиваемых версий
-    versions = versions[:MAX_VERSIONS_TO_DOWNLOAD]
-    
+    if 'versions' in crate:
+        # Точный набор версий (режим замыкания зависимостей)
+        versions = crate['versions']
+    else:
+        versions = get_crate_versions(crate_name)
+        if not versions:
+            return False
+
+        if SKIP_YANKED:
+            versions = [version for version in versions if not version.get('yanked')]
+
+        # Ограничиваем количество скачиваемых версий
+        versions = versions[:MAX_VERSIONS_TO_DOWNLOAD]
+
+    ok = True
     for version in versions:
         if shutdown_flag:
-            break
+            return False
         version_num = version['num']
-        download_crate_version(crate_name, version_num, progress)
+        if version.get('yanked'):
+            logging.info(f"{crate_name} {version_num} is yanked")
+        if not download_crate_version(crate_name, version_num, progress, version.get('checksum')):
+            ok = False
         time.sleep(REQUEST_DELAY)  # Задержка между запросами
+    return ok
+
+def download_all_crates(crates, progress, start=1, total=None, max_workers=MAX_WORKERS):
+    """Скачивает crates параллельно в пуле из max_workers потоков.
+
+    В очереди пула держится не больше 2 * max_workers задач, чтобы не
+    создавать сразу сотни тысяч futures для всего списка.
+    """
+    total = total or len(crates)
+    pending = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for index, crate in enumerate(crates, start=start):
+            if shutdown_flag:
+                break
+            if len(pending) >= max_workers * 2:
+                _, pending = wait(pending, return_when=FIRST_COMPLETED)
+            logging.info(f"Downloading crate {index} of {total}: {crate['name']}")
+            pending.add(executor.submit(download_crate, crate, progress))
+        wait(pending)
+
+def download_from_queue(queue, progress, max_workers=MAX_WORKERS):
+    """Разбирает общую очередь в max_workers потоков.
+
+    Поток берет crate в аренду, скачивает его и отмечает выполненным; при ошибке
+    crate возвращается в очередь. Работа заканчивается, когда свободных задач нет.
+    """
+    def worker():
+        while not shutdown_flag:
+            claimed = queue.claim()
+            if not claimed:
+                return
+            key, crate = claimed[0]
+            logging.info(f"Claimed crate {key}")
+            if download_crate(crate, progress):
+                if not queue.complete(key):
+                    logging.warning(f"Lease for crate {key} was lost, another worker took it")
+            elif not shutdown_flag:
+                queue.release(key)
+            else:
+                # При остановке crate не возвращаем: аренда истечет, и его заберет другой исполнитель
+                queue.abandon(key)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        wait([executor.submit(worker) for _ in range(max_workers)])
+    logging.info(f"Work queue status: {queue.counts()}")
+
+def fill_queue(queue, crates):
+    """Переносит список crates в очередь (в задачу кладем только имя и точные версии)."""
+    added = queue.add(
+        (crate['name'], {key: crate[key] for key in ('name', 'versions') if key in crate})
+        for crate in crates
+    )
+    logging.info(f"Added {added} crates to work queue {WORK_QUEUE_FILE}")
+
+def create_crate_index():
+    """Создает источник версий из sparse-индекса (HTTP или локальная копия)."""
+    return SparseIndex(url=SPARSE_INDEX_URL, local_dir=SPARSE_INDEX_DIR,
+                       cache_dir=INDEX_CACHE_DIR, session=session)
 
 def main():
     """Основная функция для скачивания crates."""
-    crates = load_crates_list()
-    if not crates:
-        logging.error("No crates to download. Exiting.")
-        return
-
-    # Загружаем прогресс
-    progress = load_progress()
-
-    # Общее количество элементов
-    total_crates = len(crates)
-    logging.info(f"Total crates to download: {total_crates}")
-
-    # Определяем индекс, с которого начать скачивание
-    start_index = 0
-    if START_FROM_CRATE:
-        for i, crate in enumerate(crates):
-            if crate['name'] == START_FROM_CRATE:
-                start_index = i
-                break
+    global crate_index, download_url_template, checksum_manifest
+    if VERSION_SOURCE == "sparse" or SEED_FILES:
+        crate_index = create_crate_index()
 
-    for index, crate in enumerate(crates[start_index:], start=start_index + 1):
-        if shutdown_flag:
-            break
-        logging.info(f"Downloading crate {index} of {total_crates}: {crate['name']}")
-        download_crate(crate, progress)
+    queue = WorkQueue(WORK_QUEUE_FILE) if WORK_QUEUE_FILE else None
+
+    # Очередь заполняет первый запущенный исполнитель, остальные сразу разбирают ее.
+    # Полностью разобранная очередь заполняется снова: новые crates добавятся, а уже
+    # выполненные ключи пропускаются
+    counts = queue.counts() if queue is not None else {}
+    if counts.get("pending") or counts.get("leased"):
+        crates = None
+    else:
+        if SEED_FILES:
+            # crate_closure нужен tomllib (tomli на Python < 3.11) - импортируем только в этом режиме
+            from crate_closure import resolve_seed_files
+            crates = resolve_seed_files(crate_index, SEED_FILES, CLOSURE_LATEST_VERSIONS)
+        else:
+            crates = load_crates_list()
+        if not crates:
+            logging.error("No crates to download. Exiting.")
+            if queue is not None:
+                queue.close()
+            return
+        if queue is not None:
+            fill_queue(queue, crates)
+
+    # Создаем каталог для скачивания, если он не существует
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+
+    # Загружаем прогресс. С общей очередью журнал пишут несколько процессов,
+    # поэтому он не сворачивается (это сделает следующий запуск без очереди)
+    progress = ProgressStore(PROGRESS_FILE, PROGRESS_JOURNAL_FILE,
+                             compact_every=None if queue is not None else PROGRESS_COMPACT_EVERY)
+    checksum_manifest = ChecksumManifest(os.path.join(DOWNLOAD_DIR, CHECKSUM_MANIFEST_FILE))
+
+    if DOWNLOAD_URL_STRATEGY == "index":
+        try:
+            download_url_template = (crate_index or create_crate_index()).get_config()["dl"]
+            logging.info(f"Download URL template from index config: {download_url_template}")
+        except Exception as e:
+            logging.error(f"Failed to load index config.json, falling back to API download URLs: {e}")
+
+    try:
+        if queue is not None:
+            logging.info(f"Work queue status: {queue.counts()}")
+            download_from_queue(queue, progress)
+        else:
+            # Общее количество элементов
+            total_crates = len(crates)
+            logging.info(f"Total crates to download: {total_crates}")
+
+            # Определяем индекс, с которого начать скачивание. В режиме замыкания список
+            # отсортирован по имени и заранее неизвестен, поэтому START_FROM_CRATE не применяется
+            start_index = 0
+            if START_FROM_CRATE and not SEED_FILES:
+                for i, crate in enumerate(crates):
+                    if crate['name'] == START_FROM_CRATE:
+                        start_index = i
+                        break
+
+            download_all_crates(crates[start_index:], progress, start=start_index + 1, total=total_crates)
+    finally:
+        if queue is not None:
+            queue.close()
+        progress.close()
+        checksum_manifest.close()
+        if crate_index is not None:
+            crate_index.log_stats()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
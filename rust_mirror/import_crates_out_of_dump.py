@@ -1,7 +1,20 @@
-import psycopg2
+import codecs
+import csv
 import json
+import gzip
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import time
 from datetime import datetime
 
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None  # Нужен только для SOURCE = "postgres"
+
 # Параметры подключения к PostgreSQL
 DB_CONFIG = {
     "dbname": "rust",
@@ -12,27 +25,56 @@ DB_CONFIG = {
 }
 PAGE_SIZE = 50000
 
+# Источник данных:
+# "postgres" - дамп, предварительно восстановленный в PostgreSQL (DB_CONFIG),
+# "archive"  - сам архив db-dump.tar.gz, CSV-файлы читаются из него потоком без распаковки
+#              на диск; результат всегда пишется в EXPORT_FILE (NDJSON)
+SOURCE = "postgres"
+
+# Архив дампа crates.io (https://static.crates.io/db-dump.tar.gz)
+DUMP_ARCHIVE = "db-dump.tar.gz"
+
+# Режим выгрузки:
+# "pages"  - файлы crates_page_N.json по PAGE_SIZE строк (как раньше),
+# "stream" - одно соединение и серверный курсор, строки сразу пишутся в NDJSON
+#            (по одному JSON-объекту на строку), память не зависит от размера таблицы
+EXPORT_MODE = "pages"
+
+# Файл для режима "stream" (к имени добавится .gz или .zst при сжатии)
+EXPORT_FILE = "crates.ndjson"
+
+# Сжатие для режима "stream": None, "gzip" или "zstd" (нужен пакет zstandard)
+EXPORT_COMPRESSION = None
+
+# Сколько строк серверный курсор забирает за один сетевой запрос
+CURSOR_ITERSIZE = 2000
+
+# Как часто выводить прогресс в режиме "stream" (в строках)
+PROGRESS_EVERY = 10000
+
+# Выгружаемые столбцы таблицы crates
+CRATE_COLUMNS = "id, name, updated_at, created_at, description, homepage, repository, readme, documentation"
+
 def datetime_serializer(obj):
     """Сериализует объекты datetime в строки."""
     if isinstance(obj, datetime):
         return obj.isoformat()
     raise TypeError(f"Type {type(obj)} not serializable")
 
-def fetch_data(start_id=None):
+def fetch_data(conn, start_id=None):
     """Выполняет запрос к базе данных с пагинацией."""
-    query = """
-        SELECT id, name, updated_at, created_at, description, homepage, repository, readme, documentation
+    query = f"""
+        SELECT {CRATE_COLUMNS}
         FROM crates
         WHERE id > %s
         ORDER BY id
         LIMIT %s;
     """
-    with psycopg2.connect(**DB_CONFIG) as conn:
-        with conn.cursor() as cur:
-            cur.execute(query, (start_id or 0, PAGE_SIZE))
-            columns = [desc[0] for desc in cur.description]  # Получаем имена столбцов
-            data = cur.fetchall()
-            return columns, data
+    with conn.cursor() as cur:
+        cur.execute(query, (start_id or 0, PAGE_SIZE))
+        columns = [desc[0] for desc in cur.description]  # Получаем имена столбцов
+        data = cur.fetchall()
+        return columns, data
 
 def save_to_file(data, columns, filename):
     """Сохраняет данные в файл."""
@@ -43,24 +85,158 @@ def save_to_file(data, columns, filename):
         # Сериализуем данные с учётом datetime
         json.dump(data_dicts, f, indent=2, default=datetime_serializer)
 
-def main():
+def open_export_file(filename, compression=None):
+    """Открывает файл выгрузки на запись в текстовом режиме, при необходимости со сжатием."""
+    if compression == "gzip":
+        return gzip.open(filename + ".gz", 'wt', encoding='utf-8')
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise SystemExit("Для сжатия zstd установите пакет zstandard: pip install zstandard")
+        raw = open(filename + ".zst", 'wb')
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding='utf-8')
+    return open(filename, 'w', encoding='utf-8')
+
+def parse_dump_value(column, value):
+    """Приводит значение из CSV дампа к виду, который дает выгрузка из PostgreSQL."""
+    if value == "":
+        return None  # COPY ... CSV пишет NULL как пустое поле
+    if column == "id":
+        return int(value)
+    if column in ("updated_at", "created_at"):
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            return value
+    return value
+
+def read_dump_archive(path):
+    """Читает записи crates из архива дампа crates.io за один проход.
+
+    Архив читается в потоковом режиме (r|gz), поэтому файлы внутри доступны
+    только по порядку. Из crate_downloads.csv и versions.csv сохраняются лишь
+    небольшие агрегаты по id crate (число загрузок и самая новая версия),
+    а строки crates.csv (с тяжелыми readme) сбрасываются во временный файл и
+    дополняются агрегатами после окончания архива. В памяти не держится ни
+    одной таблицы целиком.
+    """
+    columns = [column.strip() for column in CRATE_COLUMNS.split(",")]
+    downloads = {}
+    newest_versions = {}
+    csv.field_size_limit(sys.maxsize)  # readme может быть больше стандартного лимита поля
+
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as spool:
+        with tarfile.open(path, "r|gz") as tar:
+            for member in tar:
+                table = os.path.basename(member.name)
+                if table not in ("crates.csv", "versions.csv", "crate_downloads.csv"):
+                    continue
+                print(f"Reading {member.name}...")
+                # TextIOWrapper не работает с файлами потокового tarfile (нет seekable),
+                # поэтому строки декодируются по одной
+                reader = csv.DictReader(codecs.iterdecode(tar.extractfile(member), "utf-8"))
+                if table == "crate_downloads.csv":
+                    for row in reader:
+                        downloads[int(row["crate_id"])] = int(row["downloads"])
+                elif table == "versions.csv":
+                    for row in reader:
+                        crate_id = int(row["crate_id"])
+                        newest = newest_versions.get(crate_id)
+                        if newest is None or row["created_at"] > newest[0]:
+                            newest_versions[crate_id] = (row["created_at"], row["num"])
+                else:
+                    for row in reader:
+                        record = {column: parse_dump_value(column, row.get(column, "")) for column in columns}
+                        # В старых дампах число загрузок хранится прямо в crates.csv
+                        if row.get("downloads"):
+                            downloads.setdefault(record["id"], int(row["downloads"]))
+                        spool.write(json.dumps(record) + "\n")
+
+        spool.seek(0)
+        for line in spool:
+            record = json.loads(line)
+            record["downloads"] = downloads.get(record["id"], 0)
+            record["newest_version"] = newest_versions.get(record["id"], (None, None))[1]
+            yield record
+
+def export_archive():
+    """Выгружает crates из архива дампа в NDJSON без промежуточного PostgreSQL."""
+    rows = 0
+    started = time.monotonic()
+    with open_export_file(EXPORT_FILE, EXPORT_COMPRESSION) as out:
+        for record in read_dump_archive(DUMP_ARCHIVE):
+            out.write(json.dumps(record) + "\n")
+            rows += 1
+            if rows % PROGRESS_EVERY == 0:
+                elapsed = time.monotonic() - started
+                print(f"Exported {rows} rows ({rows / elapsed:.0f} rows/sec)")
+
+    elapsed = time.monotonic() - started
+    print(f"Exported {rows} rows in {elapsed:.1f} s ({rows / max(elapsed, 1e-9):.0f} rows/sec)")
+
+def export_pages():
+    """Выгружает таблицу постранично в файлы crates_page_N.json."""
     start_id = None
     page = 1
 
-    while True:
-        print(f"Fetching page {page}...")
-        columns, data = fetch_data(start_id)
-        if not data:
-            break
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        while True:
+            print(f"Fetching page {page}...")
+            columns, data = fetch_data(conn, start_id)
+            if not data:
+                break
+
+            # Сохраняем данные в файл
+            save_to_file(data, columns, f"crates_page_{page}.json")
+
+            # Обновляем start_id для следующей страницы
+            start_id = data[-1][0]  # Предполагаем, что id — это первый столбец
+            page += 1
+    finally:
+        conn.close()
 
-        # Сохраняем данные в файл
-        save_to_file(data, columns, f"crates_page_{page}.json")
+def export_stream():
+    """Выгружает таблицу одним проходом серверного курсора в NDJSON."""
+    query = f"SELECT {CRATE_COLUMNS} FROM crates ORDER BY id"
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        # Именованный курсор живет на сервере и отдает строки порциями по itersize,
+        # поэтому в памяти одновременно находится не больше CURSOR_ITERSIZE строк
+        with conn.cursor(name="crates_export") as cur:
+            cur.itersize = CURSOR_ITERSIZE
+            cur.execute(query)
 
-        # Обновляем start_id для следующей страницы
-        start_id = data[-1][0]  # Предполагаем, что id — это первый столбец
-        page += 1
+            columns = None
+            rows = 0
+            started = time.monotonic()
+            with open_export_file(EXPORT_FILE, EXPORT_COMPRESSION) as out:
+                for row in cur:
+                    if columns is None:
+                        columns = [desc[0] for desc in cur.description]
+                    out.write(json.dumps(dict(zip(columns, row)), default=datetime_serializer) + "\n")
+                    rows += 1
+                    if rows % PROGRESS_EVERY == 0:
+                        elapsed = time.monotonic() - started
+                        print(f"Exported {rows} rows ({rows / elapsed:.0f} rows/sec)")
+
+            elapsed = time.monotonic() - started
+            print(f"Exported {rows} rows in {elapsed:.1f} s ({rows / max(elapsed, 1e-9):.0f} rows/sec)")
+    finally:
+        conn.close()
+
+def main():
+    if SOURCE == "archive":
+        export_archive()
+    elif psycopg2 is None:
+        raise SystemExit("Для SOURCE = \"postgres\" установите пакет psycopg2: pip install psycopg2")
+    elif EXPORT_MODE == "stream":
+        export_stream()
+    else:
+        export_pages()
 
     print("Data fetching completed.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,24 +1,116 @@
 import json
 import glob
+import gzip
+import heapq
+import os
 
 # Папка с файлами страниц
-PAGES_DIR = "//"
+PAGES_DIR = "."
+
+# Шаблоны файлов страниц: JSON-массивы (crates_page_N.json) и NDJSON (*.ndjson, в т.ч. .gz).
+# Каждая страница должна быть отсортирована по MERGE_KEY (import_crates_out_of_dump.py так и пишет)
+PAGE_PATTERNS = ["crates_page_*.json"]
 
 # Файл для объединённого списка
 OUTPUT_FILE = "combined_crates.json"
 
+# Поле, по которому страницы отсортированы и по которому удаляются дубликаты
+MERGE_KEY = "id"
+
+# Размер порции чтения файла страницы (в символах)
+READ_CHUNK_SIZE = 1 << 20
+
+def open_text(path):
+    """Открывает файл на чтение как текст (.gz распаковывается на лету)."""
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+def iter_json_array(path):
+    """Построчно (по одному элементу) читает JSON-массив, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    with open_text(path) as f:
+        buf = ""
+        pos = 0
+        eof = False
+        started = False
+        while True:
+            # Пропускаем пробелы, открывающую скобку и запятые между элементами
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ',' or (buf[pos] == '[' and not started)):
+                if buf[pos] == '[':
+                    started = True
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"{path}: unexpected end of file")
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Элемент не поместился в буфер целиком - дочитываем файл
+                if eof:
+                    raise
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+            pos = end
+
+def iter_ndjson(path):
+    """Читает NDJSON-файл по одному объекту на строку."""
+    with open_text(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def iter_page(path):
+    """Читает элементы страницы и проверяет, что они отсортированы по MERGE_KEY."""
+    reader = iter_ndjson if ".ndjson" in path or ".jsonl" in path else iter_json_array
+    previous = None
+    for item in reader(path):
+        key = item[MERGE_KEY]
+        if previous is not None and key < previous:
+            raise ValueError(f"{path} is not sorted by {MERGE_KEY}: {key!r} after {previous!r}")
+        previous = key
+        yield item
+
+def merge_pages(paths):
+    """K-way слияние отсортированных страниц с удалением дубликатов по MERGE_KEY.
+
+    В памяти одновременно находится по одному текущему элементу из каждой
+    страницы, поэтому потребление памяти не зависит от общего числа crates.
+    """
+    previous = None
+    for item in heapq.merge(*(iter_page(path) for path in paths), key=lambda item: item[MERGE_KEY]):
+        key = item[MERGE_KEY]
+        if key == previous:
+            continue  # Дубликат (например, страницы из повторной выгрузки пересекаются)
+        previous = key
+        yield item
+
 def combine_pages():
-    combined_data = []
-    
-    # Читаем все файлы страниц
-    for filepath in glob.glob(f"crates_page_*.json"):
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-            combined_data.extend(data)
-    
-    # Сохраняем объединённый список
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(combined_data, f, indent=2)
+    paths = sorted({path for pattern in PAGE_PATTERNS for path in glob.glob(os.path.join(PAGES_DIR, pattern))})
+    print(f"Merging {len(paths)} page files...")
+
+    # Сохраняем объединённый список потоково: по одному элементу на строку
+    count = 0
+    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+        f.write("[\n")
+        for item in merge_pages(paths):
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(item))
+            count += 1
+        f.write("\n]\n")
+    print(f"Saved {count} unique crates to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    combine_pages()
\ No newline at end of file
+    combine_pages()
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+import logging
+
+import requests
+
+# Клиент sparse-индекса cargo (https://index.crates.io).
+# Файл индекса crate - это JSON-записи по одной на строку, по записи на каждую версию
+# в порядке публикации. Такой же формат лежит в git-копии индекса crates.io-index,
+# поэтому индекс можно читать как по HTTP, так и из локального каталога.
+
+# URL sparse-индекса crates.io
+SPARSE_INDEX_URL = "https://index.crates.io"
+
+# Каталог кэша файлов индекса (для условных запросов)
+INDEX_CACHE_DIR = "index_cache"
+
+# Сколько секунд считать файл из кэша свежим и не спрашивать сервер вообще
+INDEX_CACHE_TTL = 6 * 3600
+
+def index_prefix(crate_name):
+    """Возвращает каталог файла индекса без имени crate (1, 2, 3/a, ab/cd)."""
+    if len(crate_name) <= 2:
+        return str(len(crate_name))
+    if len(crate_name) == 3:
+        return f"3/{crate_name[0]}"
+    return f"{crate_name[:2]}/{crate_name[2:4]}"
+
+def index_path(crate_name):
+    """Возвращает относительный путь к файлу индекса crate (1/a, 2/ab, 3/a/abc, ab/cd/abcd...)."""
+    name = crate_name.lower()
+    return f"{index_prefix(name)}/{name}"
+
+def expand_dl_template(template, crate_name, version, checksum=None):
+    """Строит ссылку на .crate по шаблону dl из config.json индекса.
+
+    Поддерживает маркеры cargo {crate}, {version}, {prefix}, {lowerprefix} и
+    {sha256-checksum}. Если маркеров нет, cargo дописывает /{crate}/{version}/download.
+    """
+    markers = ("{crate}", "{version}", "{prefix}", "{lowerprefix}", "{sha256-checksum}")
+    if not any(marker in template for marker in markers):
+        return f"{template.rstrip('/')}/{crate_name}/{version}/download"
+    return (template
+            .replace("{crate}", crate_name)
+            .replace("{version}", version)
+            .replace("{prefix}", index_prefix(crate_name))
+            .replace("{lowerprefix}", index_prefix(crate_name.lower()))
+            .replace("{sha256-checksum}", checksum or ""))
+
+def parse_index_file(text):
+    """Разбирает файл индекса в список записей о версиях."""
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+class SparseIndex:
+    """Источник версий crates из sparse-индекса.
+
+    Если указан local_dir, файлы читаются из локальной копии индекса без сети.
+    Иначе файлы скачиваются по HTTP и кэшируются в cache_dir вместе с ETag и
+    Last-Modified: повторный запрос неизменившегося crate стоит один ответ 304,
+    а в пределах cache_ttl секунд - ни одного запроса.
+    """
+
+    def __init__(self, url=SPARSE_INDEX_URL, local_dir=None, cache_dir=INDEX_CACHE_DIR,
+                 cache_ttl=INDEX_CACHE_TTL, session=None):
+        self.url = url.rstrip('/')
+        self.local_dir = local_dir
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.session = session or requests.Session()
+        self.stats_lock = threading.Lock()
+        self.stats = {"fetched": 0, "not_modified": 0, "cached": 0, "missing": 0}
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def get_config(self):
+        """Возвращает config.json индекса (шаблон dl, адрес api)."""
+        if self.local_dir:
+            with open(os.path.join(self.local_dir, "config.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        response = self.session.get(f"{self.url}/config.json")
+        response.raise_for_status()
+        return response.json()
+
+    def get_entries(self, crate_name, refresh=False):
+        """Возвращает записи индекса для crate (пустой список, если crate не найден).
+
+        refresh=True - не доверять кэшу в пределах cache_ttl (условный запрос к серверу).
+        """
+        text = self._read_local(crate_name) if self.local_dir else self._fetch(crate_name, refresh)
+        if text is None:
+            self._count("missing")
+            return []
+        return parse_index_file(text)
+
+    def get_versions(self, crate_name):
+        """Возвращает версии в формате API crates.io, начиная с самой новой.
+
+        Каждая версия - словарь с ключами num, checksum (sha256 файла .crate) и yanked.
+        """
+        return [
+            {"num": entry["vers"], "checksum": entry["cksum"], "yanked": entry.get("yanked", False)}
+            for entry in reversed(self.get_entries(crate_name))
+        ]
+
+    def _read_local(self, crate_name):
+        path = os.path.join(self.local_dir, *index_path(crate_name).split('/'))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._count("cached")
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _fetch(self, crate_name, refresh=False):
+        relative_path = index_path(crate_name)
+        cache_file = os.path.join(self.cache_dir, *relative_path.split('/'))
+        meta_file = cache_file + ".meta"
+
+        meta = None
+        try:
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
+
+        if meta is not None and os.path.exists(cache_file):
+            if not refresh and time.time() - meta.get("checked_at", 0) < self.cache_ttl:
+                self._count("cached")
+                return self._read_cache(cache_file)
+        else:
+            meta = None
+
+        # Условный запрос: если файл не менялся, сервер ответит 304 без тела
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self.session.get(f"{self.url}/{relative_path}", headers=headers)
+        if response.status_code == 304 and meta:
+            self._count("not_modified")
+            meta["checked_at"] = time.time()
+            self._write_file(meta_file, json.dumps(meta))
+            return self._read_cache(cache_file)
+        if response.status_code in (403, 404, 410):
+            return None
+        response.raise_for_status()
+
+        self._count("fetched")
+        text = response.content.decode('utf-8')
+        self._write_file(cache_file, text)
+        self._write_file(meta_file, json.dumps({
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked_at": time.time(),
+        }))
+        return text
+
+    @staticmethod
+    def _read_cache(cache_file):
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    @staticmethod
+    def _write_file(path, text):
+        """Записывает файл атомарно (через временный файл), безопасно для нескольких потоков."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def log_stats(self):
+        """Выводит в лог статистику обращений к индексу."""
+        logging.info(
+            "Sparse index: fetched {fetched}, not modified (304) {not_modified}, "
+            "from cache {cached}, missing {missing}".format(**self.stats)
+        )